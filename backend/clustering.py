@@ -0,0 +1,139 @@
+"""
+Near-duplicate memo clustering for the moderation queue.
+
+Memos are normalized, split into character shingles and summarized with a
+MinHash signature. Signatures are banded for LSH so that each new memo is
+matched against recent clusters with a constant number of dict lookups.
+Clusters expire after a sliding time window.
+"""
+
+import re
+import time
+import uuid
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+SHINGLE_SIZE = 3
+NUM_BANDS = 8
+ROWS_PER_BAND = 4
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed coefficients so signatures are stable across restarts
+_PERMUTATIONS = [
+    (zlib.crc32(f"a{i}".encode()) | 1, zlib.crc32(f"b{i}".encode()))
+    for i in range(NUM_HASHES)
+]
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_memo(memo: str) -> str:
+    """Casefold a memo and collapse punctuation, symbols and whitespace."""
+    return _NON_WORD.sub(" ", memo.casefold()).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Character shingles of a normalized memo."""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature of a normalized memo."""
+    hashed = [zlib.crc32(s.encode()) for s in shingles(text)]
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashed) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_HASHES
+
+
+class _Cluster:
+    __slots__ = ("id", "signature", "count", "last_seen", "band_keys")
+
+    def __init__(self, cluster_id: str, signature: Tuple[int, ...], band_keys: List[tuple], now: float):
+        self.id = cluster_id
+        self.signature = signature
+        self.count = 0
+        self.last_seen = now
+        self.band_keys = band_keys
+
+
+class MemoClusterIndex:
+    """Groups similar memos seen within a sliding time window."""
+
+    def __init__(self, window_seconds: float = 300, threshold: float = 0.6):
+        self.window_seconds = window_seconds
+        self.threshold = threshold
+        self._buckets: Dict[tuple, _Cluster] = {}
+        self._clusters: Dict[str, _Cluster] = {}
+        self._timeline: Deque[Tuple[float, _Cluster]] = deque()
+
+    def add(self, memo: str, now: Optional[float] = None) -> Tuple[str, int]:
+        """Add a memo and return its (cluster_id, cluster_count)."""
+        now = time.time() if now is None else now
+        self._expire(now)
+
+        text = normalize_memo(memo)
+        if not text:
+            # Nothing to compare (e.g. emoji only): never group with other memos
+            cluster = self._new_cluster((), [], now)
+        else:
+            signature = minhash(text)
+            band_keys = [
+                (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+                for band in range(NUM_BANDS)
+            ]
+
+            cluster = None
+            for key in band_keys:
+                candidate = self._buckets.get(key)
+                if candidate and similarity(signature, candidate.signature) >= self.threshold:
+                    cluster = candidate
+                    break
+
+            if cluster is None:
+                cluster = self._new_cluster(signature, band_keys, now)
+
+        cluster.count += 1
+        cluster.last_seen = now
+        self._timeline.append((now, cluster))
+        return cluster.id, cluster.count
+
+    def _new_cluster(self, signature: Tuple[int, ...], band_keys: List[tuple], now: float) -> _Cluster:
+        cluster = _Cluster(uuid.uuid4().hex[:12], signature, band_keys, now)
+        self._clusters[cluster.id] = cluster
+        for key in band_keys:
+            self._buckets.setdefault(key, cluster)
+        return cluster
+
+    def count(self, cluster_id: str) -> int:
+        """Number of memos in a live cluster (0 if expired)."""
+        cluster = self._clusters.get(cluster_id)
+        return cluster.count if cluster else 0
+
+    def clear(self):
+        """Forget all clusters."""
+        self._buckets.clear()
+        self._clusters.clear()
+        self._timeline.clear()
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._timeline and self._timeline[0][0] < cutoff:
+            _, cluster = self._timeline.popleft()
+            if cluster.last_seen >= cutoff or cluster.id not in self._clusters:
+                continue
+            del self._clusters[cluster.id]
+            for key in cluster.band_keys:
+                if self._buckets.get(key) is cluster:
+                    del self._buckets[key]
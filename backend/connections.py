@@ -0,0 +1,215 @@
+"""
+WebSocket connection management: heartbeats, idle reaping, inbound rate
+limits, connection caps, lifetime stats and optional outbound batching.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import WebSocket
+
+# Close codes (RFC 6455)
+GOING_AWAY = 1001
+POLICY_VIOLATION = 1008
+TRY_AGAIN_LATER = 1013
+
+
+class ClientState:
+    """Bookkeeping for one connected client."""
+    __slots__ = ("connected_at", "last_seen", "tokens", "last_refill", "dropped_in_a_row", "messages")
+
+    def __init__(self, now: float, burst: int):
+        self.connected_at = now
+        self.last_seen = now
+        self.tokens = float(burst)
+        self.last_refill = now
+        self.dropped_in_a_row = 0
+        self.messages = 0
+
+
+class ConnectionManager:
+    """Tracks the clients of one WebSocket channel."""
+
+    def __init__(
+        self,
+        name: str,
+        max_connections: int = 50,
+        idle_timeout: float = 60.0,
+        heartbeat_interval: float = 20.0,
+        rate_limit: float = 10.0,
+        burst: int = 20,
+        send_timeout: float = 5.0,
+        batch_window: float = 0.0,
+        max_batch: int = 50
+    ):
+        self.name = name
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.send_timeout = send_timeout
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.clients: Dict[WebSocket, ClientState] = {}
+        self.totals = {
+            "accepted": 0, "rejected": 0, "reaped": 0, "rate_limited": 0, "send_failures": 0,
+            "batches": 0, "batched_messages": 0
+        }
+        self._closed_lifetimes: List[float] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __iter__(self):
+        return iter(list(self.clients))
+
+    async def connect(self, websocket: WebSocket) -> bool:
+        """Accept a client, or close it if the channel is full."""
+        await websocket.accept()
+        if len(self.clients) >= self.max_connections:
+            self.totals["rejected"] += 1
+            await websocket.close(code=TRY_AGAIN_LATER)
+            return False
+        self.clients[websocket] = ClientState(time.monotonic(), self.burst)
+        self.totals["accepted"] += 1
+        return True
+
+    def disconnect(self, websocket: WebSocket):
+        state = self.clients.pop(websocket, None)
+        if state is not None:
+            self._closed_lifetimes.append(time.monotonic() - state.connected_at)
+            # Keep a bounded window of recent lifetimes
+            del self._closed_lifetimes[:-1000]
+
+    def allow(self, websocket: WebSocket) -> bool:
+        """Record an inbound message and apply the per-client token bucket."""
+        state = self.clients.get(websocket)
+        if state is None:
+            return False
+        now = time.monotonic()
+        state.last_seen = now
+        state.messages += 1
+        state.tokens = min(self.burst, state.tokens + (now - state.last_refill) * self.rate_limit)
+        state.last_refill = now
+        if state.tokens >= 1:
+            state.tokens -= 1
+            state.dropped_in_a_row = 0
+            return True
+        state.dropped_in_a_row += 1
+        self.totals["rate_limited"] += 1
+        return False
+
+    def should_disconnect(self, websocket: WebSocket) -> bool:
+        """A client that keeps flooding past its limit gets disconnected."""
+        state = self.clients.get(websocket)
+        return state is not None and state.dropped_in_a_row > self.burst
+
+    async def send(self, websocket: WebSocket, text: str) -> bool:
+        try:
+            await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            return True
+        except Exception:
+            self.totals["send_failures"] += 1
+            self.disconnect(websocket)
+            # Close so the receive loop ends instead of serving a client we dropped
+            await self._close(websocket, GOING_AWAY)
+            return False
+
+    async def broadcast(self, message: Dict[str, Any]):
+        """Send one message to every client concurrently, dropping dead ones."""
+        # Anything still queued goes out first so clients see messages in order
+        if self._pending:
+            await self.flush()
+        await self._send_to_all(message)
+
+    async def queue(self, message: Dict[str, Any]):
+        """
+        Coalesce a message into the next ``events_batch`` frame.
+
+        The batch is sent after ``batch_window`` seconds or once it holds
+        ``max_batch`` messages; with batching off this is a plain broadcast.
+        """
+        if self.batch_window <= 0:
+            await self.broadcast(message)
+            return
+        if not self.clients:
+            return
+        self._pending.append(message)
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Send queued messages now."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._send_pending()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        self._flush_task = None
+        await self._send_pending()
+
+    async def _send_pending(self):
+        pending, self._pending = self._pending, []
+        if len(pending) == 1:
+            await self._send_to_all(pending[0])
+        elif pending:
+            self.totals["batches"] += 1
+            self.totals["batched_messages"] += len(pending)
+            await self._send_to_all({"type": "events_batch", "messages": pending})
+
+    async def _send_to_all(self, message: Dict[str, Any]):
+        if not self.clients:
+            return
+        text = json.dumps(message)
+        await asyncio.gather(*(self.send(client, text) for client in list(self.clients)))
+
+    async def reap_idle(self):
+        """Close clients that have not been heard from within the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        for websocket, state in list(self.clients.items()):
+            if state.last_seen < cutoff:
+                self.totals["reaped"] += 1
+                self.disconnect(websocket)
+                await self._close(websocket, GOING_AWAY)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass  # already gone
+
+    async def heartbeat(self):
+        """Ping clients periodically and reap the ones that stopped answering."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.reap_idle()
+            await self.broadcast({"type": "ping", "timestamp": int(time.time())})
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        ages = [now - state.connected_at for state in self.clients.values()]
+        closed = self._closed_lifetimes
+        return {
+            "connected": len(self.clients),
+            "max_connections": self.max_connections,
+            **self.totals,
+            "batch_window_ms": round(self.batch_window * 1000),
+            "current_age_seconds": {
+                "max": round(max(ages), 1) if ages else 0,
+                "avg": round(sum(ages) / len(ages), 1) if ages else 0
+            },
+            "closed_lifetime_seconds": {
+                "count": len(closed),
+                "max": round(max(closed), 1) if closed else 0,
+                "avg": round(sum(closed) / len(closed), 1) if closed else 0
+            }
+        }
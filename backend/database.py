@@ -4,24 +4,57 @@ Simple database operations for stream overlay.
 
 import os
 import time
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text, func, case, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.event import listens_for
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
-from typing import List
+from typing import Dict, Iterator, List, Optional
 
 try:
-    from .models import Base, Event, BannedWord
+    from .models import Base, Event, BannedWord, DonorStat, TierStat, MinuteStat
+    from .clustering import MemoClusterIndex
 except ImportError:
-    from models import Base, Event, BannedWord
+    from models import Base, Event, BannedWord, DonorStat, TierStat, MinuteStat
+    from clustering import MemoClusterIndex
+
+def make_engine(url: str) -> Engine:
+    """Create the engine; SQLite gets WAL so long reads never block writes."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False)
+    
+    # Streaming responses iterate on threadpool workers, so SQLite connections
+    # must be usable from more than one thread
+    sqlite_engine = create_engine(url, echo=False, connect_args={"check_same_thread": False})
+    
+    @listens_for(sqlite_engine, "connect")
+    def _enable_wal(dbapi_connection, _record):
+        # With the default rollback journal an export's open cursor holds a
+        # SHARED lock, so donations could not be written until it finished
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+    
+    return sqlite_engine
 
 # Simple SQLite setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///overlay.db")
-engine = create_engine(DATABASE_URL, echo=False)
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+# Near-duplicate memo clusters for the moderation queue
+memo_clusters = MemoClusterIndex(
+    window_seconds=float(os.getenv("MEMO_CLUSTER_WINDOW_SECONDS", "300")),
+    threshold=float(os.getenv("MEMO_CLUSTER_THRESHOLD", "0.6")),
+)
+
+# Banned words cached in memory; see load_banned_words()
+_banned_words: Optional[List[str]] = None
+
 def init_db():
     """Create tables and add default banned words."""
     Base.metadata.create_all(bind=engine)
+    _upgrade_schema()
     
     # Add some default banned words
     with get_session() as db:
@@ -30,6 +63,30 @@ def init_db():
             for word in default_words:
                 db.add(BannedWord(word=word))
             db.commit()
+        
+        # Backfill summary tables for databases created before they existed
+        needs_rebuild = (
+            db.query(Event.id).first() is not None
+            and db.query(DonorStat.sender).first() is None
+        )
+    
+    if needs_rebuild:
+        rebuild_stats()
+
+def _upgrade_schema():
+    """Add model columns and indexes missing from tables created by an older version."""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
 
 @contextmanager
 def get_session():
@@ -50,9 +107,15 @@ def get_banned_words() -> List[str]:
         words = db.query(BannedWord).filter(BannedWord.active == True).all()
         return [word.word.lower() for word in words]
 
+def load_banned_words() -> List[str]:
+    """(Re)load the banned word cache used by is_memo_banned."""
+    global _banned_words
+    _banned_words = get_banned_words()
+    return _banned_words
+
 def is_memo_banned(memo: str) -> bool:
     """Simple banned word check."""
-    banned_words = get_banned_words()
+    banned_words = _banned_words if _banned_words is not None else load_banned_words()
     memo_lower = memo.lower()
     return any(word in memo_lower for word in banned_words)
 
@@ -67,6 +130,9 @@ def create_event(signature: str, sender: str, amount: float, memo: str, tier: st
         # Auto-filter check
         auto_filtered = is_memo_banned(memo)
         
+        # Group near-duplicate memos
+        cluster_id, cluster_count = memo_clusters.add(memo)
+        
         # Create event
         event = Event(
             id=signature,
@@ -77,10 +143,13 @@ def create_event(signature: str, sender: str, amount: float, memo: str, tier: st
             tier=tier,
             status="pending" if auto_filtered else "pending",  # Always pending for now
             created_at=int(time.time()),
-            auto_filtered=auto_filtered
+            auto_filtered=auto_filtered,
+            cluster_id=cluster_id,
+            cluster_count=cluster_count
         )
         
         db.add(event)
+        _record_donation(db, event)
         db.commit()
         db.refresh(event)
         # Convert to dict to avoid session issues
@@ -100,6 +169,8 @@ def approve_event(event_id: str) -> dict:
     with get_session() as db:
         event = db.query(Event).filter(Event.id == event_id).first()
         if event:
+            if event.status != "approved":
+                _record_approval(db, event)
             event.status = "approved"
             event.decided_at = int(time.time())
             db.commit()
@@ -112,6 +183,8 @@ def skip_event(event_id: str) -> dict:
     with get_session() as db:
         event = db.query(Event).filter(Event.id == event_id).first()
         if event:
+            if event.status == "approved":
+                _record_approval(db, event, sign=-1)
             event.status = "skipped" 
             event.decided_at = int(time.time())
             db.commit()
@@ -119,10 +192,193 @@ def skip_event(event_id: str) -> dict:
             return event.to_dict()
         return None
 
+def set_moderation_scores(event_id: str, scores: Optional[Dict[str, float]]) -> Optional[dict]:
+    """Store scorer results on an event; returns the event, or None if it is gone."""
+    with get_session() as db:
+        event = db.query(Event).filter(Event.id == event_id).first()
+        if not event:
+            return None
+        event.moderation_scores = scores
+        db.commit()
+        db.refresh(event)
+        return event.to_dict()
+
+def iter_event_batches(
+    status: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    sender: Optional[str] = None,
+    tier: Optional[str] = None,
+    batch_size: int = 1000
+) -> Iterator[List[dict]]:
+    """Stream matching events in created_at order, one batch of dicts at a time."""
+    events = Event.__table__
+    query = select(events).order_by(events.c.created_at.asc(), events.c.id.asc())
+    if status:
+        query = query.where(events.c.status == status)
+    if since is not None:
+        query = query.where(events.c.created_at >= since)
+    if until is not None:
+        query = query.where(events.c.created_at < until)
+    if sender:
+        query = query.where(events.c.sender == sender)
+    if tier:
+        query = query.where(events.c.tier == tier)
+    
+    # Plain rows with a server-side cursor keep memory flat: nothing is
+    # loaded into the session identity map
+    with get_session() as db:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        keys = list(result.keys())
+        for partition in result.partitions():
+            yield [dict(zip(keys, row)) for row in partition]
+
+def _decide_cluster(cluster_id: str, status: str) -> List[dict]:
+    """Set the status of every pending event in a cluster."""
+    # A missing id would match every unclustered event (cluster_id IS NULL)
+    if not cluster_id:
+        return []
+    with get_session() as db:
+        events = db.query(Event).filter(
+            Event.cluster_id == cluster_id,
+            Event.status == "pending"
+        ).order_by(Event.created_at.asc()).all()
+        decided_at = int(time.time())
+        for event in events:
+            if status == "approved":
+                _record_approval(db, event)
+            event.status = status
+            event.decided_at = decided_at
+        db.commit()
+        return [event.to_dict() for event in events]
+
+def approve_cluster(cluster_id: str) -> List[dict]:
+    """Approve all pending events in a cluster."""
+    return _decide_cluster(cluster_id, "approved")
+
+def skip_cluster(cluster_id: str) -> List[dict]:
+    """Skip all pending events in a cluster."""
+    return _decide_cluster(cluster_id, "skipped")
+
 def clear_events():
     """Clear all events (for testing)."""
     with get_session() as db:
         count = db.query(Event).count()
         db.query(Event).delete()
+        db.query(DonorStat).delete()
+        db.query(TierStat).delete()
+        db.query(MinuteStat).delete()
+        db.commit()
+        memo_clusters.clear()
+        return count
+
+def _stat_row(db: Session, model, key):
+    """Fetch a summary row by primary key, creating a zeroed one if missing."""
+    row = db.get(model, key)
+    if row is None:
+        pk = model.__table__.primary_key.columns.values()[0].name
+        zeros = {
+            column.name: 0 for column in model.__table__.columns
+            if column.name != pk and not column.nullable
+        }
+        row = model(**{pk: key}, **zeros)
+        db.add(row)
+    return row
+
+def _record_donation(db: Session, event: Event):
+    """Add a new event to the running summary tables."""
+    donor = _stat_row(db, DonorStat, event.sender)
+    donor.total_amount += event.amount
+    donor.donation_count += 1
+    donor.last_donation_at = max(donor.last_donation_at or 0, event.created_at)
+    
+    tier = _stat_row(db, TierStat, event.tier)
+    tier.total_amount += event.amount
+    tier.donation_count += 1
+    
+    minute = _stat_row(db, MinuteStat, event.created_at // 60)
+    minute.total_amount += event.amount
+    minute.donation_count += 1
+
+def _record_approval(db: Session, event: Event, sign: int = 1):
+    """Add a newly approved event to the running summary tables (sign=-1 to take it back out)."""
+    donor = _stat_row(db, DonorStat, event.sender)
+    donor.approved_amount += sign * event.amount
+    donor.approved_count += sign
+    
+    tier = _stat_row(db, TierStat, event.tier)
+    tier.approved_amount += sign * event.amount
+    tier.approved_count += sign
+
+def rebuild_stats():
+    """Recompute all summary tables from the events table."""
+    approved = Event.status == "approved"
+    approved_amount = func.sum(case((approved, Event.amount), else_=0.0))
+    approved_count = func.sum(case((approved, 1), else_=0))
+    
+    with get_session() as db:
+        db.query(DonorStat).delete()
+        db.query(TierStat).delete()
+        db.query(MinuteStat).delete()
+        
+        donors = db.query(
+            Event.sender, func.sum(Event.amount), func.count(Event.id),
+            approved_amount, approved_count, func.max(Event.created_at)
+        ).group_by(Event.sender)
+        for sender, total, count, ok_amount, ok_count, last_at in donors:
+            db.add(DonorStat(
+                sender=sender, total_amount=total, donation_count=count,
+                approved_amount=ok_amount, approved_count=ok_count,
+                last_donation_at=last_at
+            ))
+        
+        tiers = db.query(
+            Event.tier, func.sum(Event.amount), func.count(Event.id),
+            approved_amount, approved_count
+        ).group_by(Event.tier)
+        for tier, total, count, ok_amount, ok_count in tiers:
+            db.add(TierStat(
+                tier=tier, total_amount=total, donation_count=count,
+                approved_amount=ok_amount, approved_count=ok_count
+            ))
+        
+        minute_key = Event.created_at // 60
+        minutes = db.query(
+            minute_key, func.sum(Event.amount), func.count(Event.id)
+        ).group_by(minute_key)
+        for minute, total, count in minutes:
+            db.add(MinuteStat(minute=minute, total_amount=total, donation_count=count))
+        
         db.commit()
-        return count
\ No newline at end of file
+
+def get_leaderboard(limit: int = 10, by: str = "approved") -> List[dict]:
+    """Top senders by approved (default) or total donated amount."""
+    column = DonorStat.approved_amount if by == "approved" else DonorStat.total_amount
+    with get_session() as db:
+        donors = db.query(DonorStat).filter(column > 0).order_by(
+            column.desc(), DonorStat.sender.asc()
+        ).limit(limit).all()
+        return [donor.to_dict() for donor in donors]
+
+def get_stats(minutes: int = 30) -> dict:
+    """Totals per tier and donations per minute over a recent window."""
+    since = int(time.time()) // 60 - minutes + 1
+    with get_session() as db:
+        tiers = [tier.to_dict() for tier in db.query(TierStat).order_by(TierStat.tier).all()]
+        recent = [
+            minute.to_dict() for minute in
+            db.query(MinuteStat).filter(MinuteStat.minute >= since).order_by(MinuteStat.minute.asc()).all()
+        ]
+    
+    recent_count = sum(minute["donation_count"] for minute in recent)
+    return {
+        "tiers": tiers,
+        "totals": {
+            "total_amount": sum(tier["total_amount"] for tier in tiers),
+            "donation_count": sum(tier["donation_count"] for tier in tiers),
+            "approved_amount": sum(tier["approved_amount"] for tier in tiers),
+            "approved_count": sum(tier["approved_count"] for tier in tiers)
+        },
+        "per_minute": recent,
+        "donations_per_minute": recent_count / minutes if minutes else 0.0
+    }
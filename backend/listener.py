@@ -1,4 +1,5 @@
 import os
+import logging
 from dotenv import load_dotenv
 import asyncio
 import aiohttp
@@ -6,9 +7,11 @@ from typing import Any, Callable, Dict
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 AI16Z_MINT = os.getenv('AI16Z_MINT', 'HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC')
-HELIUS_BASE = 'https://api.helius.xyz/v0'
-RPC_BASE = 'https://mainnet.helius-rpc.com'
+HELIUS_BASE = os.getenv('API_BASE', 'https://api.helius.xyz/v0')
+RPC_BASE = os.getenv('RPC_BASE', 'https://mainnet.helius-rpc.com')
 MEMO_PID = 'MemoSq4gqABAXKb96qnH8TysNcWxMyWCqXgDLGmfcHr'
 
 API_KEY = os.getenv('HELIUS_API_KEY', '')
@@ -43,6 +46,7 @@ async def start_listener_task(broadcast: Callable[[Dict[str, Any]], Any]):
                 base = f"{HELIUS_BASE}/addresses/{PRIZE_WALLET}/transactions?api-key={API_KEY}&limit=50"
                 url = f"{base}&before={before}" if before else base
                 page = await _fetch_json(session, url)
+                logger.debug("Fetched %d transactions", len(page or []), extra={"sample_every": 20})
                 for tx in page or []:
                     # filter for AI16Z token transfers to our wallet or ATA
                     for t in tx.get('tokenTransfers', []):
@@ -64,4 +68,5 @@ async def start_listener_task(broadcast: Callable[[Dict[str, Any]], Any]):
                 before = (page[-1]['signature'] if page else before)
                 await asyncio.sleep(3)
             except Exception:
+                logger.exception("Listener poll failed, retrying in 5s", extra={"rate_limit": 60})
                 await asyncio.sleep(5)
\ No newline at end of file
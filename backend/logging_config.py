@@ -0,0 +1,157 @@
+"""
+Non-blocking JSON-lines logging.
+
+Records are filtered (level, sampling, rate limits) on the calling thread,
+then handed to a QueueHandler; formatting and I/O happen on a
+QueueListener thread so the event loop never waits on stdout or disk.
+
+Environment:
+    LOG_LEVEL   default level (INFO)
+    LOG_LEVELS  per-module levels, e.g. "listener=DEBUG,database=WARNING"
+    LOG_FILE    optional file to append JSON lines to (besides stderr)
+
+Per-call options via ``extra``:
+    sample_every=N   emit only every Nth occurrence of this message
+    rate_limit=S     emit at most once every S seconds, counting suppressed
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+_CONTROL_ATTRS = {"sample_every", "rate_limit"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in _CONTROL_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass every Nth occurrence of records logged with ``extra={"sample_every": N}``."""
+
+    def __init__(self):
+        super().__init__()
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample_every", None)
+        if not every or every <= 1:
+            return True
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % every:
+            return False
+        record.sampled = every
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Pass records logged with ``extra={"rate_limit": S}`` at most once per S seconds."""
+
+    def __init__(self):
+        super().__init__()
+        self._state: Dict[Tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        interval = getattr(record, "rate_limit", None)
+        if not interval:
+            return True
+        key = (record.name, record.msg)
+        state = self._state.setdefault(key, [0.0, 0])  # last emitted, suppressed
+        now = time.monotonic()
+        if now - state[0] < interval:
+            state[1] += 1
+            return False
+        if state[1]:
+            record.suppressed = state[1]
+        state[0], state[1] = now, 0
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched; formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Parse "name=LEVEL,other=LEVEL" into logger levels."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    levels: Optional[str] = None,
+    log_file: Optional[str] = None,
+    stream=None
+) -> logging.handlers.QueueListener:
+    """Install the queue-backed JSON logging pipeline (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(stream or sys.stderr)]
+    log_file = log_file if log_file is not None else os.getenv("LOG_FILE")
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+
+    # Modules may be imported as "main" or "backend.main"
+    for name, module_level in parse_levels(levels if levels is not None else os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(module_level)
+        logging.getLogger(f"backend.{name}").setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -3,35 +3,53 @@ Simple FastAPI server for stream overlay donations.
 """
 
 import os
+import io
+import csv
 import asyncio
 import time
 import json
 import logging
-import requests
 from typing import Dict, Any, List, Optional
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 try:
     from .database import (
         init_db, create_event, get_pending_events, 
-        approve_event, skip_event, clear_events, is_memo_banned
+        approve_event, skip_event, clear_events, is_memo_banned,
+        approve_cluster, skip_cluster, get_leaderboard, get_stats, rebuild_stats,
+        iter_event_batches, load_banned_words, set_moderation_scores
     )
-    from .listener import start_listener_task
+    from .startup import (
+        set_status, warm_up, run_in_background, supervise, readiness_report, is_ready,
+        cancel_background_tasks
+    )
+    from .media_cache import MediaCache, UnsupportedMediaType, is_allowed_media
+    from .connections import ConnectionManager, POLICY_VIOLATION
+    from .logging_config import configure_logging
+    from .moderation import ModerationRunner, parse_specs
 except ImportError:
     from database import (
         init_db, create_event, get_pending_events,
-        approve_event, skip_event, clear_events, is_memo_banned
+        approve_event, skip_event, clear_events, is_memo_banned,
+        approve_cluster, skip_cluster, get_leaderboard, get_stats, rebuild_stats,
+        iter_event_batches, load_banned_words, set_moderation_scores
     )
-    try:
-        from listener import start_listener_task
-    except ImportError:
-        start_listener_task = None
+    from startup import (
+        set_status, warm_up, run_in_background, supervise, readiness_report, is_ready,
+        cancel_background_tasks
+    )
+    from media_cache import MediaCache, UnsupportedMediaType, is_allowed_media
+    from connections import ConnectionManager, POLICY_VIOLATION
+    from logging_config import configure_logging
+    from moderation import ModerationRunner, parse_specs
 
 load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Simple FastAPI app
 app = FastAPI(title="Crypto Stream Overlay", version="1.0.0")
@@ -46,17 +64,85 @@ app.add_middleware(
 )
 
 # WebSocket clients
-overlay_clients: set[WebSocket] = set()
-dashboard_clients: set[WebSocket] = set()
+def connection_manager(name: str, **options) -> ConnectionManager:
+    return ConnectionManager(
+        name,
+        max_connections=int(os.getenv("MAX_CONNECTIONS", "50")),
+        idle_timeout=float(os.getenv("CONNECTION_TIMEOUT_SECONDS", "60")),
+        heartbeat_interval=float(os.getenv("WS_HEARTBEAT_SECONDS", "20")),
+        rate_limit=float(os.getenv("WS_RATE_LIMIT_PER_SECOND", "10")),
+        burst=int(os.getenv("WS_RATE_LIMIT_BURST", "20")),
+        **options
+    )
+
+def dashboard_manager() -> ConnectionManager:
+    """Dashboard channel, optionally coalescing bursts into events_batch frames."""
+    return connection_manager(
+        "dashboard",
+        batch_window=float(os.getenv("DASHBOARD_BATCH_MS", "0") or 0) / 1000,
+        max_batch=int(os.getenv("DASHBOARD_BATCH_MAX", "50")),
+    )
+
+overlay_clients = connection_manager("overlay")
+dashboard_clients = dashboard_manager()
+
+# Dashboard messages that may be coalesced; everything else is sent immediately
+BATCHED_DASHBOARD_TYPES = {
+    "new_event", "event_scored", "event_approved", "event_skipped", "cluster_approved", "cluster_skipped"
+}
 
 # Simple settings
 AUTO_MODE = os.getenv("AUTO_MODE", "false").lower() == "true"
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "5"))
+
+HELIUS_RPC_BASE = os.getenv("RPC_BASE", "https://mainnet.helius-rpc.com")
+
+# Minimum amounts per tier, highest first
+TIER_THRESHOLDS = [
+    ("whale", float(os.getenv("TIER_WHALE", "100000"))),
+    ("high", float(os.getenv("TIER_HIGH", "10000"))),
+    ("mid", float(os.getenv("TIER_MID", "1000"))),
+]
+
+DONATION_MINT = os.getenv("AI16Z_MINT", "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC")
+DEFAULT_MEDIA_URL = os.getenv("DEFAULT_MEDIA_URL", "media/alert.gif")
+
+# Optional process-pool memo scorers (MODERATION_SCORERS)
+def moderation_runner() -> Optional[ModerationRunner]:
+    specs = parse_specs(os.getenv("MODERATION_SCORERS", ""))
+    if not specs:
+        return None
+    return ModerationRunner(
+        specs,
+        max_workers=int(os.getenv("MODERATION_WORKERS", "1")),
+        timeout=float(os.getenv("MODERATION_TIMEOUT_SECONDS", "2")),
+        threshold=float(os.getenv("MODERATION_THRESHOLD", "0.8")),
+        batch_window=float(os.getenv("MODERATION_BATCH_MS", "10")) / 1000,
+        max_batch=int(os.getenv("MODERATION_BATCH_MAX", "32")),
+        load_timeout=float(os.getenv("MODERATION_LOAD_TIMEOUT_SECONDS", "60")),
+    )
+
+moderation = moderation_runner()
+
+# Last leaderboard pushed to overlays
+last_leaderboard: Optional[List[tuple]] = None  # None until the first push
+
+# Remote logos and alert assets, fetched once and served locally
+media_cache = MediaCache(
+    directory=os.getenv("MEDIA_CACHE_DIR", "media_cache"),
+    max_bytes=int(os.getenv("MEDIA_CACHE_MAX_MB", "100")) * 1024 * 1024,
+    max_size=int(os.getenv("MEDIA_SIZE", "0") or 0),
+)
 
 # API Models
 class EventAction(BaseModel):
     event_id: str
     action: str  # "approve" or "skip"
 
+class ClusterAction(BaseModel):
+    cluster_id: str
+    action: str  # "approve" or "skip"
+
 class TokenMetadata(BaseModel):
     mint: str
     symbol: Optional[str] = None
@@ -66,7 +152,23 @@ class TokenMetadata(BaseModel):
 
 @app.get("/health")
 async def health():
-    return {"ok": True, "timestamp": int(time.time())}
+    return {"ok": True, "ready": is_ready(), "timestamp": int(time.time())}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe with per-component status and warm-up timings."""
+    report = readiness_report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/status")
+async def status():
+    """WebSocket connection stats per channel."""
+    return {
+        "overlay": overlay_clients.stats(),
+        "dashboard": dashboard_clients.stats(),
+        "moderation": moderation.stats() if moderation else None,
+        "timestamp": int(time.time())
+    }
 
 @app.get("/api/events/pending")
 async def get_pending():
@@ -74,6 +176,48 @@ async def get_pending():
     events = get_pending_events()
     return events  # Already converted to dicts
 
+@app.get("/api/events/export")
+async def export_events(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    sender: Optional[str] = None,
+    tier: Optional[str] = None
+):
+    """Stream event history as NDJSON or CSV."""
+    batches = iter_event_batches(status=status, since=since, until=until, sender=sender, tier=tier)
+    if format == "ndjson":
+        body, media_type = _ndjson_chunks(batches), "application/x-ndjson"
+    elif format == "csv":
+        body, media_type = _csv_chunks(batches), "text/csv"
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename=events.{format}"
+    })
+
+def _ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(row) + "\n" for row in batch)
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = None
+    for batch in batches:
+        if writer is None and batch:
+            writer = csv.DictWriter(buffer, fieldnames=list(batch[0].keys()))
+            writer.writeheader()
+        # JSON columns (moderation_scores) are written as JSON, not Python reprs
+        writer.writerows(
+            {key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in row.items()}
+            for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
 @app.post("/api/events/action")
 async def moderate_event(action: EventAction):
     """Approve or skip an event."""
@@ -81,15 +225,13 @@ async def moderate_event(action: EventAction):
         event = approve_event(action.event_id)
         if event:
             # Broadcast to overlay for display
-            await broadcast_to_overlay({
-                "type": "show_donation",
-                "event": event
-            })
+            await show_donation(event)
             # Notify dashboard
             await broadcast_to_dashboard({
                 "type": "event_approved", 
                 "event_id": action.event_id
             })
+            await push_leaderboard_if_changed()
             return {"success": True, "action": "approved"}
     
     elif action.action == "skip":
@@ -99,28 +241,138 @@ async def moderate_event(action: EventAction):
                 "type": "event_skipped",
                 "event_id": action.event_id  
             })
+            await push_leaderboard_if_changed()
             return {"success": True, "action": "skipped"}
     
     return {"success": False, "error": "Invalid action or event not found"}
 
+@app.post("/api/clusters/action")
+async def moderate_cluster(action: ClusterAction):
+    """Approve or skip every pending event in a near-duplicate cluster."""
+    if action.action == "approve":
+        events = await decide_cluster(action.cluster_id, approve=True)
+        if events:
+            return {"success": True, "action": "approved", "count": len(events)}
+    
+    elif action.action == "skip":
+        events = await decide_cluster(action.cluster_id, approve=False)
+        if events:
+            return {"success": True, "action": "skipped", "count": len(events)}
+    
+    return {"success": False, "error": "Invalid action or cluster not found"}
+
+async def decide_cluster(cluster_id: str, approve: bool) -> List[dict]:
+    """Moderate a cluster and broadcast a single update for it."""
+    events = approve_cluster(cluster_id) if approve else skip_cluster(cluster_id)
+    if not events:
+        return events
+    
+    if approve:
+        # Show one representative donation instead of every copy
+        await show_donation({**events[0], "cluster_count": len(events)})
+        await push_leaderboard_if_changed()
+    
+    await broadcast_to_dashboard({
+        "type": "cluster_approved" if approve else "cluster_skipped",
+        "cluster_id": cluster_id,
+        "event_ids": [event["id"] for event in events]
+    })
+    return events
+
 @app.delete("/api/events")
 async def clear_all_events():
     """Clear all events."""
     count = clear_events()
     await broadcast_to_dashboard({"type": "events_cleared", "count": count})
+    await push_leaderboard_if_changed()
     return {"success": True, "cleared": count}
 
+@app.get("/api/stats/leaderboard")
+async def leaderboard(limit: int = Query(10, ge=1, le=100), by: str = "approved"):
+    """Top senders by approved or total donated amount."""
+    if by not in ("approved", "total"):
+        raise HTTPException(status_code=400, detail="by must be 'approved' or 'total'")
+    return get_leaderboard(limit, by)
+
+@app.get("/api/stats")
+async def stats(minutes: int = Query(30, ge=1, le=1440)):
+    """Totals per tier and donations per minute."""
+    return get_stats(minutes)
+
+@app.post("/api/stats/rebuild")
+async def rebuild_all_stats():
+    """Recompute summary tables from the events table."""
+    rebuild_stats()
+    await push_leaderboard_if_changed()
+    return {"success": True}
+
+async def push_leaderboard_if_changed():
+    """Send the overlay leaderboard only when the top N changed."""
+    global last_leaderboard
+    top = get_leaderboard(LEADERBOARD_SIZE)
+    snapshot = [(donor["sender"], donor["approved_amount"]) for donor in top]
+    if snapshot == last_leaderboard:
+        return
+    last_leaderboard = snapshot
+    await broadcast_to_overlay({"type": "leaderboard_update", "leaderboard": top})
+
+# Well-known tokens served without a Helius lookup
+WELL_KNOWN_TOKENS = {
+    "So11111111111111111111111111111111111111112": {
+        "symbol": "SOL",
+        "name": "Solana",
+        "decimals": 9,
+        "logo": "https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/So11111111111111111111111111111111111111112/logo.png",
+        "mint": "So11111111111111111111111111111111111111112"
+    },
+    "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC": {
+        "symbol": "AI16Z",
+        "name": "ai16z",
+        "decimals": 6,
+        "logo": "https://arweave.net/yPPLSRJCJBpj0teCRvwJKYNj1Z5K7vCLZfqxjWaKpjE",
+        "mint": "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC"
+    },
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": {
+        "symbol": "USDC",
+        "name": "USD Coin",
+        "decimals": 6,
+        "logo": "https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v/logo.png",
+        "mint": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+    }
+}
+
+POPULAR_TOKENS = [
+    "So11111111111111111111111111111111111111112",  # SOL
+    "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC",  # AI16Z
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
+    "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263",  # BONK
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
+    "7vfCXTUXx5WJV5JADk17DUJ4ksgau7utNKj4b963voxs",  # ETH (Wormhole)
+]
+
+def with_cached_logo(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the local /media/cache path for a token's logo."""
+    if not metadata.get("logo"):
+        return metadata
+    return {**metadata, "logo_cached": media_cache.register(metadata["logo"])}
+
+# Helius metadata by mint, filled on demand and by the startup warm-up
+token_metadata_cache: Dict[str, Dict[str, Any]] = {}
+
 def get_token_metadata_from_helius(mint_address: str) -> Optional[Dict[str, Any]]:
     """Fetch token metadata from Helius DAS API and cache it."""
+    if mint_address in token_metadata_cache:
+        return token_metadata_cache[mint_address]
+    
     helius_api_key = os.getenv('HELIUS_API_KEY')
     if not helius_api_key:
         return None
         
     try:
-        # Try to use database cache first (would need to implement)
-        # For now, just fetch directly from Helius
+        # Imported lazily: only needed once a Helius lookup actually happens
+        import requests
         
-        helius_url = f"https://mainnet.helius-rpc.com/?api-key={helius_api_key}"
+        helius_url = f"{HELIUS_RPC_BASE}/?api-key={helius_api_key}"
         
         # Fetch from Helius DAS API
         payload = {
@@ -132,7 +384,7 @@ def get_token_metadata_from_helius(mint_address: str) -> Optional[Dict[str, Any]
             }
         }
         
-        response = requests.post(helius_url, json=payload)
+        response = requests.post(helius_url, json=payload, timeout=10)
         response.raise_for_status()
         asset_data = response.json()
         
@@ -165,72 +417,41 @@ def get_token_metadata_from_helius(mint_address: str) -> Optional[Dict[str, Any]
                 logo_uri = first_file.get('uri')
                 cdn_uri = first_file.get('cdn_uri')
         
-        return {
+        metadata = {
             'symbol': symbol or mint_address[:8],
             'name': name,
             'decimals': decimals,
             'logo': cdn_uri or logo_uri,  # prefer CDN
             'mint': mint_address
         }
+        token_metadata_cache[mint_address] = metadata
+        return metadata
         
     except Exception as e:
-        print(f"Error fetching token metadata for {mint_address}: {e}")
+        logger.warning("Error fetching token metadata for %s: %s", mint_address, e)
         return None
 
 @app.get("/api/tokens/metadata/{mint_address}")
 async def get_token_metadata(mint_address: str):
     """Get token metadata for a given mint address."""
     
-    # Handle special cases for well-known tokens
-    well_known_tokens = {
-        "So11111111111111111111111111111111111111112": {
-            "symbol": "SOL",
-            "name": "Solana",
-            "decimals": 9,
-            "logo": "https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/So11111111111111111111111111111111111111112/logo.png",
-            "mint": "So11111111111111111111111111111111111111112"
-        },
-        "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC": {
-            "symbol": "AI16Z",
-            "name": "ai16z",
-            "decimals": 6,
-            "logo": "https://arweave.net/yPPLSRJCJBpj0teCRvwJKYNj1Z5K7vCLZfqxjWaKpjE",
-            "mint": "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC"
-        },
-        "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": {
-            "symbol": "USDC",
-            "name": "USD Coin",
-            "decimals": 6,
-            "logo": "https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v/logo.png",
-            "mint": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
-        }
-    }
-    
     # Check if it's a well-known token first
-    if mint_address in well_known_tokens:
-        return well_known_tokens[mint_address]
+    if mint_address in WELL_KNOWN_TOKENS:
+        return with_cached_logo(WELL_KNOWN_TOKENS[mint_address])
     
-    # Otherwise fetch from Helius
-    metadata = get_token_metadata_from_helius(mint_address)
+    # Otherwise fetch from Helius (without blocking the event loop)
+    metadata = await asyncio.to_thread(get_token_metadata_from_helius, mint_address)
     if metadata:
-        return metadata
+        return with_cached_logo(metadata)
     else:
         raise HTTPException(status_code=404, detail="Token metadata not found")
 
 @app.get("/api/tokens/popular")
 async def get_popular_tokens():
     """Get list of popular tokens with metadata."""
-    popular_tokens = [
-        "So11111111111111111111111111111111111111112",  # SOL
-        "HeLp6NuQkmYB4pYWo2zYs22mESHXPQYzXbB8n4V98jwC",  # AI16Z
-        "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
-        "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263",  # BONK
-        "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
-        "7vfCXTUXx5WJV5JADk17DUJ4ksgau7utNKj4b963voxs",  # ETH (Wormhole)
-    ]
     
     tokens = []
-    for mint in popular_tokens:
+    for mint in POPULAR_TOKENS:
         try:
             metadata = await get_token_metadata(mint)
             tokens.append(metadata)
@@ -239,43 +460,109 @@ async def get_popular_tokens():
     
     return tokens
 
+@app.get("/media/cache/{key}")
+async def cached_media(key: str, request: Request):
+    """Serve a proxied media asset, fetching it on first use."""
+    try:
+        entry = await media_cache.get(key)
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch media: {e}")
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown media")
+    if not is_allowed_media(entry["content_type"]):
+        raise HTTPException(status_code=415, detail="Unsupported media type")
+    
+    etag = f'"{entry["etag"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "X-Content-Type-Options": "nosniff",
+        # SVGs opened directly must not run scripts
+        "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox",
+    }
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(entry["path"], media_type=entry["content_type"], headers=headers)
+
+async def receive_messages(manager: ConnectionManager, websocket: WebSocket):
+    """Yield inbound JSON messages, answering pings and enforcing the rate limit."""
+    while True:
+        text = await websocket.receive_text()
+        if not manager.allow(websocket):
+            if websocket not in manager.clients:
+                return  # dropped after a failed send or reaped as idle
+            if manager.should_disconnect(websocket):
+                logger.warning("Closing %s client for exceeding the message rate limit", manager.name)
+                await websocket.close(code=POLICY_VIOLATION)
+                return
+            # Tell the client once per run of dropped messages, so a moderator
+            # knows an approve/skip did not go through
+            if manager.clients[websocket].dropped_in_a_row == 1:
+                await manager.send(websocket, json.dumps(rate_limited_notice(manager, text)))
+            continue
+        
+        try:
+            data = json.loads(text)
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        
+        msg_type = data.get("type")
+        logger.debug("%s message: %s", manager.name, msg_type, extra={"sample_every": 100})
+        if msg_type == "ping":
+            await manager.send(websocket, json.dumps({"type": "pong", "timestamp": int(time.time())}))
+        elif msg_type != "pong":
+            yield data
+
+def rate_limited_notice(manager: ConnectionManager, text: str) -> Dict[str, Any]:
+    """Message telling a client its last message was dropped."""
+    try:
+        dropped = json.loads(text)
+    except ValueError:
+        dropped = None
+    notice = {"type": "rate_limited", "retry_after": round(1 / manager.rate_limit, 2)}
+    if isinstance(dropped, dict):
+        notice["dropped"] = dropped.get("type")
+        for key in ("event_id", "cluster_id"):
+            if key in dropped:
+                notice[key] = dropped[key]
+    return notice
+
 @app.websocket("/ws/overlay")
 async def overlay_websocket(websocket: WebSocket):
     """WebSocket for OBS overlay display."""
-    print(f"Overlay WebSocket connection attempt from: {websocket.client}")
+    if not await overlay_clients.connect(websocket):
+        logger.warning("Overlay WebSocket rejected, %d clients connected", len(overlay_clients))
+        return
+    logger.info("Overlay WebSocket connected", extra={"clients": len(overlay_clients)})
     try:
-        await websocket.accept()
-        overlay_clients.add(websocket)
-        print(f"✅ Overlay WebSocket connected. Total clients: {len(overlay_clients)}")
-        
         await websocket.send_json({"type": "connected", "client": "overlay"})
+        # A fresh overlay shows the current top N without waiting for a change
+        await websocket.send_json({"type": "leaderboard_update", "leaderboard": get_leaderboard(LEADERBOARD_SIZE)})
         
-        while True:
-            # Keep connection alive and handle any messages
-            try:
-                data = await websocket.receive_text()
-                print(f"Overlay message: {data}")
-            except Exception as e:
-                print(f"Overlay WebSocket receive error: {e}")
-                break
+        # Overlays only send heartbeats
+        async for _ in receive_messages(overlay_clients, websocket):
+            pass
                 
     except WebSocketDisconnect:
-        print("Overlay WebSocket disconnected normally")
+        logger.debug("Overlay WebSocket disconnected normally")
     except Exception as e:
-        print(f"Overlay WebSocket error: {e}")
+        logger.warning("Overlay WebSocket error: %s", e)
     finally:
-        overlay_clients.discard(websocket)
-        print(f"Overlay WebSocket cleaned up. Remaining clients: {len(overlay_clients)}")
+        overlay_clients.disconnect(websocket)
+        logger.info("Overlay WebSocket closed", extra={"clients": len(overlay_clients)})
 
 @app.websocket("/ws/dashboard")  
 async def dashboard_websocket(websocket: WebSocket):
     """WebSocket for moderation dashboard."""
-    print(f"Dashboard WebSocket connection attempt from: {websocket.client}")
+    if not await dashboard_clients.connect(websocket):
+        logger.warning("Dashboard WebSocket rejected, %d clients connected", len(dashboard_clients))
+        return
+    logger.info("Dashboard WebSocket connected", extra={"clients": len(dashboard_clients)})
     try:
-        await websocket.accept()
-        dashboard_clients.add(websocket)
-        print(f"✅ Dashboard WebSocket connected. Total clients: {len(dashboard_clients)}")
-        
         # Send initial data
         pending = get_pending_events()
         await websocket.send_json({
@@ -285,22 +572,16 @@ async def dashboard_websocket(websocket: WebSocket):
         })
         
         # Handle dashboard actions
-        while True:
-            try:
-                data = await websocket.receive_json()
-                print(f"Dashboard message: {data}")
-                await handle_dashboard_message(websocket, data)
-            except Exception as e:
-                print(f"Dashboard WebSocket receive error: {e}")
-                break
+        async for data in receive_messages(dashboard_clients, websocket):
+            await handle_dashboard_message(websocket, data)
                 
     except WebSocketDisconnect:
-        print("Dashboard WebSocket disconnected normally")
+        logger.debug("Dashboard WebSocket disconnected normally")
     except Exception as e:
-        print(f"Dashboard WebSocket error: {e}")
+        logger.warning("Dashboard WebSocket error: %s", e)
     finally:
-        dashboard_clients.discard(websocket)
-        print(f"Dashboard WebSocket cleaned up. Remaining clients: {len(dashboard_clients)}")
+        dashboard_clients.disconnect(websocket)
+        logger.info("Dashboard WebSocket closed", extra={"clients": len(dashboard_clients)})
 
 async def handle_dashboard_message(websocket: WebSocket, data: dict):
     """Handle dashboard WebSocket messages."""
@@ -309,34 +590,64 @@ async def handle_dashboard_message(websocket: WebSocket, data: dict):
     if msg_type == "approve":
         event = approve_event(data.get("event_id"))
         if event:
-            await broadcast_to_overlay({"type": "show_donation", "event": event.to_dict()})
-            await broadcast_to_dashboard({"type": "event_approved", "event_id": event.id})
+            await show_donation(event)
+            await broadcast_to_dashboard({"type": "event_approved", "event_id": event["id"]})
+            await push_leaderboard_if_changed()
     
     elif msg_type == "skip":
         event = skip_event(data.get("event_id"))
         if event:
-            await broadcast_to_dashboard({"type": "event_skipped", "event_id": event.id})
+            await broadcast_to_dashboard({"type": "event_skipped", "event_id": event["id"]})
+            await push_leaderboard_if_changed()
+    
+    elif msg_type == "approve_cluster":
+        await decide_cluster(data.get("cluster_id"), approve=True)
+    
+    elif msg_type == "skip_cluster":
+        await decide_cluster(data.get("cluster_id"), approve=False)
     
     elif msg_type == "toggle_auto":
         global AUTO_MODE
         AUTO_MODE = not AUTO_MODE
         await broadcast_to_dashboard({"type": "auto_mode_changed", "auto_mode": AUTO_MODE})
 
+def alert_media_urls() -> Dict[str, str]:
+    """Remote media shown with a donation alert."""
+    urls = {}
+    token = WELL_KNOWN_TOKENS.get(DONATION_MINT) or token_metadata_cache.get(DONATION_MINT)
+    if token and token.get("logo"):
+        urls["logo_url"] = token["logo"]
+    if DEFAULT_MEDIA_URL.startswith(("http://", "https://")):
+        urls["media_url"] = DEFAULT_MEDIA_URL
+    return urls
+
+async def prefetch_alert_media():
+    """Fetch alert media into the local cache."""
+    for url in alert_media_urls().values():
+        await media_cache.prefetch(url)
+
+async def show_donation(event: dict):
+    """Send an approved donation to overlays, pointing media at the local cache."""
+    media = {field: media_cache.register(url) for field, url in alert_media_urls().items()}
+    await broadcast_to_overlay({"type": "show_donation", "event": {**event, **media}})
+
 async def broadcast_to_overlay(message: Dict[str, Any]):
     """Send message to all overlay clients (OBS)."""
-    for client in list(overlay_clients):
-        try:
-            await client.send_json(message)
-        except:
-            overlay_clients.discard(client)
+    await overlay_clients.broadcast(message)
 
 async def broadcast_to_dashboard(message: Dict[str, Any]):
-    """Send message to all dashboard clients."""
-    for client in list(dashboard_clients):
-        try:
-            await client.send_json(message)
-        except:
-            dashboard_clients.discard(client)
+    """Send message to all dashboard clients, batching high-volume updates."""
+    if message.get("type") in BATCHED_DASHBOARD_TYPES:
+        await dashboard_clients.queue(message)
+    else:
+        await dashboard_clients.broadcast(message)
+
+def classify_tier(amount: float) -> str:
+    """Donation tier for an amount."""
+    for tier, minimum in TIER_THRESHOLDS:
+        if amount >= minimum:
+            return tier
+    return "low"
 
 async def handle_new_donation(donation_data: dict):
     """Process new donation from listener."""
@@ -346,15 +657,7 @@ async def handle_new_donation(donation_data: dict):
     amount = float(donation_data.get("amount", 0))
     memo = donation_data.get("memo", "")
     
-    # Classify tier (simple version)
-    if amount >= 100000:
-        tier = "whale"
-    elif amount >= 10000: 
-        tier = "high"
-    elif amount >= 1000:
-        tier = "mid"
-    else:
-        tier = "low"
+    tier = classify_tier(amount)
     
     # Create event in database
     event = create_event(signature, sender, amount, memo, tier)
@@ -365,27 +668,105 @@ async def handle_new_donation(donation_data: dict):
         "event": event.to_dict()
     })
     
+    # Have alert media cached locally before the event is approved
+    run_in_background(prefetch_alert_media())
+    
+    # Scorers run in the background so the listener is never held up
+    if moderation:
+        run_in_background(score_new_event(event.to_dict()))
+    
     # Auto-approve if in auto mode and not banned
-    if AUTO_MODE and not event.auto_filtered:
-        approved_event = approve_event(event.id)
-        await broadcast_to_overlay({
-            "type": "show_donation",
-            "event": approved_event.to_dict()
+    elif AUTO_MODE and not event.auto_filtered:
+        await auto_approve(event.id)
+
+async def score_new_event(event: dict):
+    """Score a new event's memo, store the scores and auto-approve it if clean."""
+    # None means scoring failed or timed out
+    scores = await moderation.score(event["memo"])
+    scored = set_moderation_scores(event["id"], scores)
+    if scores is not None:
+        await broadcast_to_dashboard({
+            "type": "event_scored",
+            "event_id": event["id"],
+            "moderation_scores": scores
         })
+    
+    # A moderator may have decided the event while it was being scored
+    if (AUTO_MODE and scored and scored["status"] == "pending"
+            and not scored["auto_filtered"] and not moderation.flagged(scores)):
+        await auto_approve(event["id"])
+
+async def auto_approve(event_id: str):
+    approved_event = approve_event(event_id)
+    await show_donation(approved_event)
+    await broadcast_to_dashboard({"type": "event_approved", "event_id": event_id})
+    await push_leaderboard_if_changed()
+
+def warm_token_metadata():
+    """Prefetch Helius metadata for popular tokens and the donation token."""
+    for mint in POPULAR_TOKENS + [DONATION_MINT]:
+        if mint not in WELL_KNOWN_TOKENS:
+            get_token_metadata_from_helius(mint)
+
+def load_listener():
+    """Import the blockchain listener lazily; it pulls in aiohttp."""
+    try:
+        from .listener import start_listener_task
+    except ImportError:
+        from listener import start_listener_task
+    return start_listener_task
+
+def log_listener_crash(name: str, error: BaseException):
+    logger.error("%s crashed, restarting", name, exc_info=error, extra={"rate_limit": 60})
 
 @app.on_event("startup")
 async def startup():
     """Initialize on startup."""
-    print("Starting AI16Z Stream Overlay Backend...")
-    init_db()
-    print("Database ready")
+    logger.info("Starting AI16Z Stream Overlay Backend")
     
-    # Start blockchain listener if configured
-    if start_listener_task and os.getenv("HELIUS_API_KEY") and os.getenv("PRIZE_WALLET_ADDRESS"):
-        asyncio.create_task(start_listener_task(handle_new_donation))
-        print("Blockchain listener started")
+    # Stage 1: the database is required before serving anything
+    if await warm_up("database", init_db):
+        logger.info("Database ready")
+        if get_pending_events():
+            run_in_background(prefetch_alert_media())
+    else:
+        logger.error("Database initialization failed; see /ready")
     
-    print("Backend ready!")
+    # WebSocket heartbeats and dead-client reaping
+    run_in_background(overlay_clients.heartbeat())
+    run_in_background(dashboard_clients.heartbeat())
+    
+    # Stage 2: warm caches in the background
+    run_in_background(warm_up("moderation_filter", load_banned_words))
+    run_in_background(warm_up("token_metadata", warm_token_metadata))
+    if moderation:
+        run_in_background(warm_up("moderation_scorers", moderation.warm))
+    
+    # Stage 3: supervised blockchain listener, if configured
+    if os.getenv("HELIUS_API_KEY") and os.getenv("PRIZE_WALLET_ADDRESS"):
+        try:
+            start_listener_task = load_listener()
+        except ImportError as e:
+            set_status("listener", "failed", error=str(e))
+        else:
+            run_in_background(supervise(
+                "listener",
+                lambda: start_listener_task(handle_new_donation),
+                on_error=log_listener_crash
+            ))
+            logger.info("Blockchain listener started")
+    else:
+        set_status("listener", "disabled")
+    
+    logger.info("Backend started, warming up in background")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop heartbeats, warm-ups and the listener."""
+    await dashboard_clients.flush()
+    await cancel_background_tasks()
+    if moderation:
+        moderation.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,191 @@
+"""
+Local proxy cache for remote media (token logos, alert assets).
+
+Each remote URL is fetched once, optionally downscaled and stored on disk
+under a size-bounded LRU. Entries are addressed by a hash of their URL and
+served from /media/cache/{key}.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+
+# Remote URLs come from token metadata anyone can publish; never proxy HTML or scripts
+ALLOWED_MEDIA_TYPES = ("image/", "audio/", "video/")
+
+
+class UnsupportedMediaType(ValueError):
+    """The remote served something other than image, audio or video."""
+
+
+def is_allowed_media(content_type: str) -> bool:
+    return content_type.lower().startswith(ALLOWED_MEDIA_TYPES)
+
+Fetcher = Callable[[str], Awaitable[Tuple[bytes, str]]]
+
+
+async def http_fetch(url: str) -> Tuple[bytes, str]:
+    """Download a URL, returning (body, content type)."""
+    import aiohttp  # only needed once something is actually fetched
+
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.get(url) as r:
+            r.raise_for_status()
+            body = await r.content.read(MAX_DOWNLOAD_BYTES + 1)
+            if len(body) > MAX_DOWNLOAD_BYTES:
+                raise ValueError(f"{url} is larger than {MAX_DOWNLOAD_BYTES} bytes")
+            return body, r.content_type or "application/octet-stream"
+
+
+def downscale(body: bytes, content_type: str, max_size: int) -> Tuple[bytes, str]:
+    """Shrink a still image to fit max_size x max_size; anything else is returned unchanged."""
+    if not max_size or not content_type.startswith("image/") or "svg" in content_type:
+        return body, content_type
+    try:
+        from PIL import Image  # only needed once something is actually downscaled
+    except ImportError:  # Pillow is optional; without it media is cached as-is
+        return body, content_type
+    try:
+        img = Image.open(io.BytesIO(body))
+        if getattr(img, "is_animated", False) or max(img.size) <= max_size:
+            return body, content_type
+        fmt = img.format or "PNG"
+        img.thumbnail((max_size, max_size))
+        out = io.BytesIO()
+        img.save(out, format=fmt)
+        return out.getvalue(), f"image/{fmt.lower()}"
+    except Exception:
+        return body, content_type
+
+
+class MediaCache:
+    """Size-bounded on-disk LRU of remote media keyed by URL hash."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        max_size: int = 0,
+        fetch: Optional[Fetcher] = None
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.fetch = fetch or http_fetch
+        self._urls: Dict[str, str] = {}
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._total_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._load()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+    def register(self, url: str) -> str:
+        """Allow a remote URL to be proxied and return its cache path."""
+        key = self.key_for(url)
+        self._urls[key] = url
+        return f"/media/cache/{key}"
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Return the cache entry for a key, fetching it on first use."""
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            return entry
+
+        url = self._urls.get(key)
+        if url is None:
+            return None
+
+        # Concurrent requests for the same asset share one download
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download(key, url))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await task
+
+    async def prefetch(self, url: str) -> Optional[dict]:
+        """Fetch a URL into the cache ahead of its first display."""
+        self.register(url)
+        try:
+            return await self.get(self.key_for(url))
+        except Exception:
+            return None
+
+    async def _download(self, key: str, url: str) -> dict:
+        body, content_type = await self.fetch(url)
+        if not is_allowed_media(content_type):
+            raise UnsupportedMediaType(f"{url} is {content_type}, not image, audio or video")
+        if self.max_size:
+            body, content_type = await asyncio.to_thread(downscale, body, content_type, self.max_size)
+
+        entry = {
+            "url": url,
+            "content_type": content_type,
+            "etag": hashlib.sha256(body).hexdigest()[:32],
+            "size": len(body),
+            "path": os.path.join(self.directory, f"{key}.bin"),
+        }
+        await asyncio.to_thread(self._write, key, body, entry)
+
+        self._entries[key] = entry
+        self._total_bytes += entry["size"]
+        self._evict()
+        return entry
+
+    def _write(self, key: str, body: bytes, entry: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = entry["path"] + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, entry["path"])
+        with open(os.path.join(self.directory, f"{key}.json"), "w") as f:
+            json.dump({k: v for k, v in entry.items() if k != "path"}, f)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry["size"]
+            for path in (entry["path"], os.path.join(self.directory, f"{key}.json")):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _load(self):
+        """Rebuild the index from disk, oldest entries first."""
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            path = os.path.join(self.directory, f"{key}.bin")
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    entry = json.load(f)
+                mtime = os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+            entry["path"] = path
+            found.append((mtime, key, entry))
+
+        for _, key, entry in sorted(found):
+            self._entries[key] = entry
+            self._urls[key] = entry["url"]
+            self._total_bytes += entry["size"]
+        self._evict()
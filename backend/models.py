@@ -2,7 +2,7 @@
 Simple database models for stream overlay donations.
 """
 
-from sqlalchemy import Column, String, Integer, Float, Text, Boolean
+from sqlalchemy import Column, String, Integer, Float, Text, Boolean, JSON
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -23,15 +23,22 @@ class Event(Base):
     tier = Column(String, nullable=False)  # low/mid/high/whale
     
     # Status: pending, approved, skipped
-    status = Column(String, default="pending", nullable=False)
+    status = Column(String, default="pending", nullable=False, index=True)
     
     # Timestamps
-    created_at = Column(Integer, nullable=False)
+    created_at = Column(Integer, nullable=False, index=True)
     decided_at = Column(Integer, nullable=True)
     
     # Simple flags
     auto_filtered = Column(Boolean, default=False)  # flagged by banned words
     
+    # Near-duplicate grouping
+    cluster_id = Column(String, nullable=True, index=True)
+    cluster_count = Column(Integer, default=1)  # copies seen when this event arrived
+    
+    # Moderation scorer results, e.g. {"links": 0.0, "spam": 0.4}; null if not scored
+    moderation_scores = Column(JSON, nullable=True)
+    
     def to_dict(self):
         """Convert to dictionary for JSON responses."""
         return {
@@ -44,7 +51,10 @@ class Event(Base):
             "status": self.status,
             "created_at": self.created_at,
             "decided_at": self.decided_at,
-            "auto_filtered": self.auto_filtered
+            "auto_filtered": self.auto_filtered,
+            "cluster_id": self.cluster_id,
+            "cluster_count": self.cluster_count,
+            "moderation_scores": self.moderation_scores
         }
 
 
@@ -61,4 +71,62 @@ class BannedWord(Base):
             "id": self.id,
             "word": self.word,
             "active": self.active
-        }
\ No newline at end of file
+        }
+
+class DonorStat(Base):
+    """Running donation totals per sender (rebuildable from events)."""
+    __tablename__ = "donor_stats"
+    
+    sender = Column(String, primary_key=True)
+    total_amount = Column(Float, default=0.0, nullable=False, index=True)
+    donation_count = Column(Integer, default=0, nullable=False)
+    approved_amount = Column(Float, default=0.0, nullable=False)
+    approved_count = Column(Integer, default=0, nullable=False)
+    last_donation_at = Column(Integer, nullable=True)
+    
+    def to_dict(self):
+        return {
+            "sender": self.sender,
+            "total_amount": self.total_amount,
+            "donation_count": self.donation_count,
+            "approved_amount": self.approved_amount,
+            "approved_count": self.approved_count,
+            "last_donation_at": self.last_donation_at
+        }
+
+
+class TierStat(Base):
+    """Running donation totals per tier (rebuildable from events)."""
+    __tablename__ = "tier_stats"
+    
+    tier = Column(String, primary_key=True)
+    total_amount = Column(Float, default=0.0, nullable=False)
+    donation_count = Column(Integer, default=0, nullable=False)
+    approved_amount = Column(Float, default=0.0, nullable=False)
+    approved_count = Column(Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            "tier": self.tier,
+            "total_amount": self.total_amount,
+            "donation_count": self.donation_count,
+            "approved_amount": self.approved_amount,
+            "approved_count": self.approved_count
+        }
+
+
+class MinuteStat(Base):
+    """Donations received per minute (rebuildable from events)."""
+    __tablename__ = "minute_stats"
+    
+    minute = Column(Integer, primary_key=True)  # unix time // 60
+    total_amount = Column(Float, default=0.0, nullable=False)
+    donation_count = Column(Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            "minute": self.minute,
+            "timestamp": self.minute * 60,
+            "total_amount": self.total_amount,
+            "donation_count": self.donation_count
+        }
@@ -0,0 +1,354 @@
+"""
+Pluggable memo scorers run in a process pool.
+
+A scorer turns memos into scores between 0 (fine) and 1 (block). Scorers
+run in worker processes so heavy checks (classifiers, regex-heavy
+heuristics) never hold the event loop or the GIL. Memos arriving close
+together are scored in one batch per worker call.
+
+Scorers are named in MODERATION_SCORERS, comma separated: either a
+built-in name ("links", "spam") or "package.module:ClassName" for a
+plugin importable by the workers. Plugins subclass Scorer:
+
+    class ToxicityScorer(Scorer):
+        name = "toxicity"
+
+        def __init__(self):
+            self.model = load_model()     # once per worker process
+
+        def score_batch(self, memos):
+            return self.model.predict(memos)
+"""
+
+import asyncio
+import importlib
+import itertools
+import logging
+import re
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+Scores = Dict[str, float]
+
+
+class Scorer:
+    """Base class for moderation scorers."""
+    name = "scorer"
+
+    def score(self, memo: str) -> float:
+        raise NotImplementedError
+
+    def score_batch(self, memos: List[str]) -> List[float]:
+        """Score several memos; override when the model batches natively."""
+        return [self.score(memo) for memo in memos]
+
+
+class LinkScorer(Scorer):
+    """Flags URLs and Solana/EVM wallet addresses."""
+    name = "links"
+
+    URL = re.compile(r"(https?://|www\.)\S+|\b[\w-]+\.(com|io|xyz|gg|app|net|org|me|link)\b", re.IGNORECASE)
+    ADDRESS = re.compile(r"\b(0x[0-9a-fA-F]{40}|[1-9A-HJ-NP-Za-km-z]{32,44})\b")
+
+    def score(self, memo: str) -> float:
+        if self.URL.search(memo):
+            return 1.0
+        if self.ADDRESS.search(memo):
+            return 0.9
+        return 0.0
+
+
+class SpamScorer(Scorer):
+    """Heuristics for shouting, character floods and repeated words."""
+    name = "spam"
+
+    REPEATED_CHAR = re.compile(r"(.)\1{7,}")
+
+    def score(self, memo: str) -> float:
+        text = memo.strip()
+        if len(text) < 8:
+            return 0.0
+        score = 0.0
+        letters = [c for c in text if c.isalpha()]
+        if len(letters) >= 8 and sum(c.isupper() for c in letters) / len(letters) > 0.8:
+            score += 0.4
+        if self.REPEATED_CHAR.search(text):
+            score += 0.4
+        words = text.lower().split()
+        if len(words) >= 4 and len(set(words)) / len(words) < 0.4:
+            score += 0.5
+        return min(score, 1.0)
+
+
+BUILTIN_SCORERS = {
+    LinkScorer.name: LinkScorer,
+    SpamScorer.name: SpamScorer,
+}
+
+
+def parse_specs(spec: str) -> Tuple[str, ...]:
+    """Split "links,spam,plugins.toxicity:ToxicityScorer" into scorer specs."""
+    return tuple(filter(None, (part.strip() for part in spec.split(","))))
+
+
+def scorer_class(spec: str) -> Type[Scorer]:
+    """Resolve a built-in scorer name or a plugin "module:Class"."""
+    if spec in BUILTIN_SCORERS:
+        return BUILTIN_SCORERS[spec]
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown scorer {spec!r}; use a built-in name or 'module:Class'")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(cls, type) and issubclass(cls, Scorer)):
+        raise TypeError(f"{spec} is not a Scorer subclass")
+    return cls
+
+
+# Scorers loaded in this (worker) process, so models load once per worker
+_loaded: Dict[Tuple[str, ...], List[Scorer]] = {}
+
+
+def score_batch(specs: Tuple[str, ...], memos: List[str]) -> Tuple[List[Scores], Dict[str, str]]:
+    """
+    Run every scorer over a batch of memos. Executed in worker processes.
+
+    Returns per-memo scores and the errors of scorers that failed; logging
+    is left to the parent, since a worker has no running log listener.
+    """
+    scorers = _loaded.get(specs)
+    if scorers is None:
+        scorers = _loaded[specs] = [scorer_class(spec)() for spec in specs]
+    results: List[Scores] = [{} for _ in memos]
+    errors: Dict[str, str] = {}
+    for scorer in scorers:
+        try:
+            values = scorer.score_batch(memos)
+        except Exception as e:
+            # A broken scorer leaves its score missing, which counts as flagged
+            errors[scorer.name] = f"{type(e).__name__}: {e}"
+            continue
+        for result, value in zip(results, values):
+            result[scorer.name] = round(min(max(float(value), 0.0), 1.0), 4)
+    return results, errors
+
+
+class ModerationRunner:
+    """
+    Scores memos with the configured scorers in a process pool.
+
+    Batches wait in the parent until a worker is free, so the timeout only
+    covers time spent in a worker. A new pool loads its scorers before any
+    batch is submitted to it; slow model loading is bounded by load_timeout.
+    """
+
+    def __init__(
+        self,
+        specs: Sequence[str],
+        max_workers: int = 1,
+        timeout: float = 2.0,
+        threshold: float = 0.8,
+        batch_window: float = 0.01,
+        max_batch: int = 32,
+        load_timeout: float = 60.0,
+        executor_factory: Optional[Callable[[], ProcessPoolExecutor]] = None
+    ):
+        self.specs = tuple(specs)
+        self.names = [scorer_class(spec).name for spec in self.specs]  # fail fast on bad specs
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.threshold = threshold
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.load_timeout = load_timeout
+        self._executor_factory = executor_factory or (lambda: ProcessPoolExecutor(max_workers=self.max_workers))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._ready = False
+        self._warming: Optional[asyncio.Task] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Batches waiting for a free worker
+        self._queued: Deque[List[Tuple[str, asyncio.Future]]] = deque()
+        # Batches in a worker: id -> (batch, executor, timeout handle)
+        self._running: Dict[int, Tuple[list, Executor, asyncio.TimerHandle]] = {}
+        self._batch_ids = itertools.count()
+        self.totals = {"scored": 0, "batches": 0, "timeouts": 0, "failures": 0, "recycled": 0}
+
+    async def warm(self):
+        """Start the workers and load every scorer in them."""
+        self._start_warming()
+        await asyncio.shield(self._warming)
+        if not self._ready:
+            raise RuntimeError("Moderation scorers failed to load")
+
+    async def score(self, memo: str) -> Optional[Scores]:
+        """Scores for one memo, or None if scoring failed or timed out."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((memo, future))
+        if len(self._pending) >= self.max_batch:
+            self._submit()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._submit)
+        return await future
+
+    def flagged(self, scores: Optional[Scores]) -> bool:
+        """Whether scores should keep an event out of auto-approval."""
+        if scores is None or any(name not in scores for name in self.names):
+            return True
+        return any(value >= self.threshold for value in scores.values())
+
+    def _start_warming(self):
+        if self._executor is None:
+            self._executor = self._executor_factory()
+            self._ready = False
+        if not self._ready and self._warming is None:
+            self._warming = asyncio.ensure_future(self._warm(self._executor))
+
+    async def _warm(self, executor: Executor):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        # One empty batch per worker loads the scorers without scoring anything
+        jobs = [loop.run_in_executor(executor, score_batch, self.specs, []) for _ in range(self.max_workers)]
+        try:
+            await asyncio.wait_for(asyncio.gather(*jobs), self.load_timeout)
+        except Exception as e:
+            logger.error("Moderation scorers failed to load: %s", e or type(e).__name__, extra={"rate_limit": 60})
+            self._recycle(executor)
+            # Queued memos fail rather than wait on a pool that cannot load
+            while self._queued:
+                self._fail(self._queued.popleft(), e, executor)
+            return
+        finally:
+            self._warming = None
+        if executor is self._executor:
+            self._ready = True
+            logger.info("Moderation scorers loaded", extra={
+                "duration_ms": round((time.monotonic() - started) * 1000, 1)
+            })
+            self._dispatch()
+
+    def _submit(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.totals["batches"] += 1
+        self._queued.append(batch)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand queued batches to free workers of a warmed pool."""
+        if not self._ready:
+            if self._queued:
+                self._start_warming()
+            return
+        loop = asyncio.get_running_loop()
+        while self._queued and len(self._running) < self.max_workers:
+            batch = self._queued.popleft()
+            memos = [memo for memo, _ in batch]
+            executor = self._executor
+            try:
+                job = loop.run_in_executor(executor, score_batch, self.specs, memos)
+            except Exception as e:
+                self._fail(batch, e, executor)
+                continue
+            batch_id, started = next(self._batch_ids), time.monotonic()
+            # The worker is free and its scorers are loaded, so this clock
+            # only measures scoring
+            handle = loop.call_later(self.timeout, self._timed_out, batch_id)
+            self._running[batch_id] = (batch, executor, handle)
+            job.add_done_callback(lambda done, batch_id=batch_id, started=started:
+                                  self._resolve(batch_id, done, started))
+
+    def _timed_out(self, batch_id: int):
+        batch, executor, _ = self._running.pop(batch_id)
+        self.totals["timeouts"] += len(batch)
+        logger.warning("Moderation timed out after %.1fs", self.timeout, extra={"rate_limit": 60})
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+        # A stuck scorer would hold its worker forever; replace the pool
+        self._recycle(executor)
+        self._dispatch()
+
+    def _resolve(self, batch_id: int, done: asyncio.Future, started: float):
+        running = self._running.pop(batch_id, None)
+        if running is None:
+            return  # already timed out or failed with its pool
+        batch, executor, handle = running
+        handle.cancel()
+        if done.cancelled() or done.exception() is not None:
+            self._fail(batch, done.exception() if not done.cancelled() else None, executor)
+        else:
+            results, errors = done.result()
+            for name, error in errors.items():
+                logger.error("Scorer %s failed: %s", name, error, extra={"rate_limit": 60})
+            self.totals["scored"] += len(batch)
+            logger.debug("Scored %d memos", len(batch), extra={
+                "duration_ms": round((time.monotonic() - started) * 1000, 1), "sample_every": 100
+            })
+            for (_, future), scores in zip(batch, results):
+                if not future.done():
+                    future.set_result(scores)
+        self._dispatch()
+
+    def _fail(self, batch, error: Optional[BaseException], executor: Executor):
+        self.totals["failures"] += len(batch)
+        logger.error("Moderation batch failed: %s", error, extra={"rate_limit": 60})
+        # A crashed worker breaks the pool; start a fresh one next time
+        if isinstance(error, BrokenProcessPool):
+            self._recycle(executor)
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    def _recycle(self, executor: Executor):
+        """Drop an executor, killing its workers; the next batch warms a new one."""
+        if executor is not self._executor:
+            return  # already replaced
+        self._executor = None
+        self._ready = False
+        self.totals["recycled"] += 1
+        # Other batches on this pool die with it
+        for batch_id, (batch, owner, handle) in list(self._running.items()):
+            if owner is executor:
+                del self._running[batch_id]
+                handle.cancel()
+                self._fail(batch, None, executor)
+        # ProcessPoolExecutor cannot cancel running calls, so stop the processes
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._warming is not None:
+            self._warming.cancel()
+            self._warming = None
+        for batch in [self._pending, *self._queued]:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        self._pending = []
+        self._queued.clear()
+        if self._executor is not None:
+            self._recycle(self._executor)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "scorers": self.names,
+            "threshold": self.threshold,
+            "timeout_seconds": self.timeout,
+            "queued_batches": len(self._queued),
+            **self.totals,
+        }
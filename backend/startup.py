@@ -0,0 +1,110 @@
+"""
+Staged startup, background warm-up and readiness tracking.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+PROCESS_STARTED_AT = time.time()
+
+# Component name -> status dict reported by /ready
+components: Dict[str, Dict[str, Any]] = {}
+
+# Strong references so background tasks are not garbage collected
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def set_status(name: str, status: str, **details):
+    """Record the status of a startup component."""
+    component = components.setdefault(name, {})
+    component.update(details)
+    component["status"] = status
+    component["updated_at"] = time.time()
+
+
+def is_ready(required=("database",)) -> bool:
+    """Ready once every stage has finished and required components are up."""
+    if any(components.get(name, {}).get("status") != "ready" for name in required):
+        return False
+    return all(c["status"] != "starting" for c in components.values())
+
+
+def readiness_report() -> Dict[str, Any]:
+    """Per-component status and warm-up timings."""
+    finished = [c["finished_at"] for c in components.values() if c.get("finished_at")]
+    return {
+        "ready": is_ready(),
+        "uptime_seconds": round(time.time() - PROCESS_STARTED_AT, 3),
+        "startup_seconds": round(max(finished) - PROCESS_STARTED_AT, 3) if finished else None,
+        "components": components,
+    }
+
+
+async def warm_up(name: str, func: Callable[[], Any]) -> bool:
+    """Run a warm-up step (blocking ones in a worker thread) and time it."""
+    set_status(name, "starting")
+    started = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(func):
+            await func()
+        else:
+            await asyncio.to_thread(func)
+    except Exception as e:
+        set_status(name, "failed", error=str(e),
+                   duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                   finished_at=time.time())
+        return False
+    set_status(name, "ready", error=None,
+               duration_ms=round((time.perf_counter() - started) * 1000, 1),
+               finished_at=time.time())
+    return True
+
+
+def run_in_background(coro: Awaitable) -> asyncio.Task:
+    """Start a tracked background task."""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def cancel_background_tasks():
+    """Cancel all tracked background tasks and wait for them to finish."""
+    tasks = list(_background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def supervise(
+    name: str,
+    factory: Callable[[], Awaitable[Any]],
+    initial_backoff: float = 1.0,
+    max_backoff: float = 60.0,
+    stable_after: float = 60.0,
+    on_error: Optional[Callable[[str, BaseException], None]] = None
+):
+    """Run a long-lived coroutine, restarting it with exponential backoff on crash."""
+    backoff = initial_backoff
+    restarts = 0
+    while True:
+        started = time.monotonic()
+        set_status(name, "ready", restarts=restarts, started_at=time.time())
+        try:
+            await factory()
+        except asyncio.CancelledError:
+            set_status(name, "stopped", restarts=restarts)
+            raise
+        except Exception as e:
+            if on_error:
+                on_error(name, e)
+            if time.monotonic() - started >= stable_after:
+                backoff = initial_backoff
+            restarts += 1
+            set_status(name, "restarting", restarts=restarts, error=repr(e), retry_in=backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+        else:
+            set_status(name, "stopped", restarts=restarts)
+            return
@@ -0,0 +1,135 @@
+"""
+Tests for near-duplicate memo clustering.
+Run with: pytest tests/backend/test_clustering.py
+"""
+
+import asyncio
+
+from clustering import MemoClusterIndex, normalize_memo
+
+
+def test_normalize_memo():
+    assert normalize_memo("  GM!!  Frens...  ") == "gm frens"
+    assert normalize_memo("Привет, Стример!") == "привет стример"
+    assert normalize_memo("🚀🚀🚀") == ""
+
+
+def test_non_latin_and_emoji_memos_are_not_lumped_together():
+    index = MemoClusterIndex(window_seconds=60)
+    memos = ["🚀🚀🚀", "🔥🔥", "привет стример", "你好", "こんにちは"]
+    results = [index.add(memo, now=i) for i, memo in enumerate(memos)]
+    assert len({cluster_id for cluster_id, _ in results}) == len(memos)
+    assert all(count == 1 for _, count in results)
+
+    # Non-Latin near-duplicates still cluster
+    cluster_id, count = index.add("Привет, стример!!", now=10)
+    assert cluster_id == results[2][0]
+    assert count == 2
+
+
+def test_near_duplicates_share_cluster():
+    index = MemoClusterIndex(window_seconds=60)
+    first, count = index.add("LFG ai16z to the moon!!!", now=0)
+    assert count == 1
+
+    second, count = index.add("lfg ai16z to the moon", now=1)
+    assert second == first
+    assert count == 2
+
+    third, count = index.add("lfg AI16Z to the moooon", now=2)
+    assert third == first
+    assert count == 3
+
+
+def test_different_memos_get_different_clusters():
+    index = MemoClusterIndex(window_seconds=60)
+    first, _ = index.add("Thanks for the amazing stream", now=0)
+    second, count = index.add("What wallet do you use for staking?", now=1)
+    assert second != first
+    assert count == 1
+
+
+def test_clusters_expire_after_window():
+    index = MemoClusterIndex(window_seconds=10)
+    first, _ = index.add("raid incoming", now=0)
+    assert index.count(first) == 1
+
+    second, count = index.add("raid incoming", now=20)
+    assert second != first
+    assert count == 1
+    assert index.count(first) == 0
+
+
+def test_active_cluster_survives_window():
+    index = MemoClusterIndex(window_seconds=10)
+    first, _ = index.add("raid incoming", now=0)
+    index.add("raid incoming", now=8)
+    cluster_id, count = index.add("raid incoming!", now=15)
+    assert cluster_id == first
+    assert count == 3
+
+
+def add_donations(app, memos, sender="alice", amount=500):
+    for i, memo in enumerate(memos):
+        asyncio.run(app.handle_new_donation({
+            "signature": f"sig-{i}", "from": sender, "amount": amount, "memo": memo
+        }))
+    return app.get_pending_events()
+
+
+def test_cluster_decisions_require_a_cluster_id(db):
+    from models import Event
+
+    with db.get_session() as session:
+        # Created before clustering existed
+        session.add(Event(id="old", signature="old", sender="alice", amount=5, memo="gm",
+                          tier="low", created_at=0, cluster_id=None))
+
+    assert db.approve_cluster(None) == []
+    assert db.skip_cluster("") == []
+    assert [event["id"] for event in db.get_pending_events()] == ["old"]
+
+
+def test_approve_cluster_shows_one_donation_and_updates_stats(client, app):
+    pending = add_donations(app, ["LFG ai16z to the moon!!!", "lfg ai16z to the moon", "something else entirely"])
+    cluster_id = pending[0]["cluster_id"]
+    assert pending[1]["cluster_id"] == cluster_id
+
+    with client.websocket_connect("/ws/overlay") as overlay:
+        assert overlay.receive_json()["type"] == "connected"
+        assert overlay.receive_json()["type"] == "leaderboard_update"
+        response = client.post("/api/clusters/action", json={"cluster_id": cluster_id, "action": "approve"})
+        assert response.json() == {"success": True, "action": "approved", "count": 2}
+
+        shown = overlay.receive_json()
+        assert shown["type"] == "show_donation"
+        assert shown["event"]["cluster_count"] == 2
+        # The next overlay message is the leaderboard, not a second alert
+        assert overlay.receive_json()["type"] == "leaderboard_update"
+
+    assert [event["id"] for event in client.get("/api/events/pending").json()] == ["sig-2"]
+    leader = client.get("/api/stats/leaderboard").json()[0]
+    assert (leader["sender"], leader["approved_amount"], leader["approved_count"]) == ("alice", 1000, 2)
+
+
+def test_cluster_actions_reject_missing_or_unknown_ids(client, app):
+    add_donations(app, ["gm"])
+    for body in ({"cluster_id": "", "action": "approve"}, {"cluster_id": "nope", "action": "skip"}):
+        assert client.post("/api/clusters/action", json=body).json()["success"] is False
+    assert len(client.get("/api/events/pending").json()) == 1
+
+
+def test_dashboard_cluster_messages(client, app):
+    pending = add_donations(app, ["raid incoming", "raid incoming!!"])
+    cluster_id = pending[0]["cluster_id"]
+
+    with client.websocket_connect("/ws/dashboard") as ws:
+        assert ws.receive_json()["type"] == "dashboard_init"
+        ws.send_json({"type": "approve_cluster"})
+        ws.send_json({"type": "skip_cluster", "cluster_id": cluster_id})
+        assert ws.receive_json() == {
+            "type": "cluster_skipped", "cluster_id": cluster_id, "event_ids": ["sig-0", "sig-1"]
+        }
+
+    assert client.get("/api/events/pending").json() == []
+    assert client.get("/api/stats/leaderboard").json() == []
@@ -0,0 +1,201 @@
+"""
+Tests for WebSocket heartbeats, reaping, rate limits and connection caps.
+Run with: pytest tests/backend/test_connections.py
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from connections import ConnectionManager, GOING_AWAY, TRY_AGAIN_LATER
+
+
+class FakeSocket:
+    def __init__(self, fail=False, inbound=()):
+        self.fail = fail
+        self.inbound = list(inbound)
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        if not self.inbound:
+            raise WebSocketDisconnect()
+        return self.inbound.pop(0)
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_pong_keeps_client_from_being_reaped(app):
+    manager = ConnectionManager("test", idle_timeout=10)
+    ws = FakeSocket(inbound=[json.dumps({"type": "pong"})])
+
+    async def answer_ping():
+        await manager.connect(ws)
+        manager.clients[ws].last_seen = time.monotonic() - 60
+        with pytest.raises(WebSocketDisconnect):
+            # Pongs are consumed, not yielded; the loop ends when the socket does
+            async for _ in app.receive_messages(manager, ws):
+                pass
+        await manager.reap_idle()
+
+    asyncio.run(answer_ping())
+    assert list(manager) == [ws]
+    assert ws.closed_with is None
+
+
+def test_connection_cap(app, client, monkeypatch):
+    monkeypatch.setattr(app, "overlay_clients", ConnectionManager("overlay", max_connections=1))
+    with client.websocket_connect("/ws/overlay") as first:
+        first.receive_json()
+        with client.websocket_connect("/ws/overlay") as second:
+            with pytest.raises(WebSocketDisconnect) as exc:
+                second.receive_json()
+            assert exc.value.code == TRY_AGAIN_LATER
+        assert app.overlay_clients.stats()["rejected"] == 1
+
+
+def test_rate_limit_and_flood_disconnect():
+    manager = ConnectionManager("test", rate_limit=0.001, burst=3)
+    ws = FakeSocket()
+    asyncio.run(manager.connect(ws))
+
+    assert [manager.allow(ws) for _ in range(4)] == [True, True, True, False]
+    assert not manager.should_disconnect(ws)
+    for _ in range(3):
+        manager.allow(ws)
+    assert manager.should_disconnect(ws)
+    assert manager.stats()["rate_limited"] == 4
+
+
+def test_broadcast_drops_dead_clients():
+    manager = ConnectionManager("test")
+    alive, dead = FakeSocket(), FakeSocket(fail=True)
+    asyncio.run(manager.connect(alive))
+    asyncio.run(manager.connect(dead))
+
+    asyncio.run(manager.broadcast({"type": "show_donation"}))
+    assert len(alive.sent) == 1
+    assert len(manager) == 1
+    assert manager.stats()["send_failures"] == 1
+
+
+def test_failed_send_closes_client_and_ends_receive_loop(app):
+    manager = ConnectionManager("test")
+    ws = FakeSocket(fail=True, inbound=[json.dumps({"type": "approve", "event_id": "sig-1"})])
+
+    async def send_then_receive():
+        await manager.connect(ws)
+        await manager.broadcast({"type": "show_donation"})
+        return [data async for data in app.receive_messages(manager, ws)]
+
+    # The dropped client's message is ignored rather than raising KeyError
+    assert asyncio.run(send_then_receive()) == []
+    assert ws.closed_with == GOING_AWAY
+    assert len(manager) == 0
+
+
+def test_idle_clients_are_reaped():
+    manager = ConnectionManager("test", idle_timeout=10)
+    idle, active = FakeSocket(), FakeSocket()
+    asyncio.run(manager.connect(idle))
+    asyncio.run(manager.connect(active))
+    manager.clients[idle].last_seen = time.monotonic() - 60
+
+    asyncio.run(manager.reap_idle())
+    assert list(manager) == [active]
+    assert idle.closed_with == GOING_AWAY
+    stats = manager.stats()
+    assert stats["reaped"] == 1
+    assert stats["closed_lifetime_seconds"]["count"] == 1
+
+
+def test_rate_limited_dashboard_action_is_reported(app, client, monkeypatch):
+    monkeypatch.setattr(app, "dashboard_clients", ConnectionManager("dashboard", rate_limit=0.001, burst=1))
+    with client.websocket_connect("/ws/dashboard") as ws:
+        assert ws.receive_json()["type"] == "dashboard_init"
+        ws.send_json({"type": "toggle_auto"})
+        assert ws.receive_json()["type"] == "auto_mode_changed"
+
+        ws.send_json({"type": "approve", "event_id": "sig-1"})
+        notice = ws.receive_json()
+        assert notice["type"] == "rate_limited"
+        assert (notice["dropped"], notice["event_id"]) == ("approve", "sig-1")
+
+
+def test_queue_coalesces_within_window():
+    manager = ConnectionManager("test", batch_window=0.05, max_batch=10)
+    ws = FakeSocket()
+
+    async def burst():
+        await manager.connect(ws)
+        for i in range(3):
+            await manager.queue({"type": "new_event", "event": {"id": i}})
+        assert ws.sent == []
+        await asyncio.sleep(0.1)
+
+    asyncio.run(burst())
+    assert len(ws.sent) == 1
+    frame = json.loads(ws.sent[0])
+    assert frame["type"] == "events_batch"
+    assert [message["event"]["id"] for message in frame["messages"]] == [0, 1, 2]
+    assert manager.stats()["batches"] == 1
+
+
+def test_queue_flushes_at_max_batch_and_before_broadcast():
+    manager = ConnectionManager("test", batch_window=10, max_batch=2)
+    ws = FakeSocket()
+
+    async def burst():
+        await manager.connect(ws)
+        await manager.queue({"type": "event_skipped", "event_id": "a"})
+        await manager.queue({"type": "event_skipped", "event_id": "b"})
+        await manager.queue({"type": "event_skipped", "event_id": "c"})
+        await manager.broadcast({"type": "auto_mode_changed", "auto_mode": True})
+
+    asyncio.run(burst())
+    frames = [json.loads(text) for text in ws.sent]
+    assert [frame["type"] for frame in frames] == ["events_batch", "event_skipped", "auto_mode_changed"]
+    assert frames[1]["event_id"] == "c"
+
+
+def test_queue_without_batching_sends_immediately():
+    manager = ConnectionManager("test")
+    ws = FakeSocket()
+    asyncio.run(manager.connect(ws))
+    asyncio.run(manager.queue({"type": "new_event"}))
+    assert [json.loads(text)["type"] for text in ws.sent] == ["new_event"]
+
+
+def test_dashboard_batches_events_but_not_auto_mode(app, client, monkeypatch):
+    monkeypatch.setattr(app, "dashboard_clients", ConnectionManager("dashboard", batch_window=0.05))
+    with client.websocket_connect("/ws/dashboard") as ws:
+        assert ws.receive_json()["type"] == "dashboard_init"
+        ws.send_json({"type": "toggle_auto"})
+        assert ws.receive_json() == {"type": "auto_mode_changed", "auto_mode": True}
+
+        client.portal.call(app.handle_new_donation, {"signature": "sig-1", "amount": 5})
+        client.portal.call(app.handle_new_donation, {"signature": "sig-2", "amount": 5})
+        frame = ws.receive_json()
+        assert frame["type"] == "events_batch"
+        # Auto mode is on, so each donation is followed by its approval
+        assert [message["type"] for message in frame["messages"]] == [
+            "new_event", "event_approved", "new_event", "event_approved"
+        ]
+        assert [message["event"]["id"] for message in frame["messages"][::2]] == ["sig-1", "sig-2"]
+
+
+def test_status_endpoint(client):
+    response = client.get("/status")
+    assert set(response.json()) == {"overlay", "dashboard", "moderation", "timestamp"}
@@ -1,34 +1,45 @@
-#!/usr/bin/env python3
 """
-Test script to simulate donations for the overlay system.
+Database tests for donation events, run against an isolated SQLite file.
+Run with: pytest tests/backend/test_donations.py
 """
 
-import asyncio
-import time
-from database import create_event, get_pending_events
 
-def test_create_donations():
-    """Create some test donation events."""
-    print("Creating test donations...")
-    
-    # Test donations with different amounts and content
+def test_create_donations(db):
+    """Create test donation events with different tiers and content."""
     donations = [
         ("sig1", "wallet123", 500, "Thanks for the stream!", "low"),
-        ("sig2", "wallet456", 5000, "Great content as always", "mid"), 
+        ("sig2", "wallet456", 5000, "Great content as always", "mid"),
         ("sig3", "wallet789", 50000, "This is a scam message", "high"),  # Should be auto-filtered
         ("sig4", "walletWhale", 200000, "Whale donation incoming!", "whale"),
     ]
-    
+
     for sig, sender, amount, memo, tier in donations:
-        event = create_event(sig, sender, amount, memo, tier)
-        event_dict = event.to_dict()
-        print(f"Created event: {event_dict['memo'][:30]}... (filtered: {event_dict['auto_filtered']})")
-    
-    # Check pending events
-    pending = get_pending_events()
-    print(f"\nPending events: {len(pending)}")
-    for event in pending:
-        print(f"- {event.memo[:30]}... (${event.amount:.0f})")
-
-if __name__ == "__main__":
-    test_create_donations()
\ No newline at end of file
+        event = db.create_event(sig, sender, amount, memo, tier)
+        assert event.to_dict()["auto_filtered"] == (sig == "sig3")
+
+    pending = db.get_pending_events()
+    assert [event["id"] for event in pending] == ["sig1", "sig2", "sig3", "sig4"]
+
+
+def test_create_event_is_idempotent(db):
+    db.create_event("sig1", "wallet123", 500, "gm", "low")
+    db.create_event("sig1", "wallet123", 500, "gm", "low")
+    assert len(db.get_pending_events()) == 1
+    assert db.get_leaderboard(by="total")[0]["donation_count"] == 1
+
+
+def test_approve_and_skip(db):
+    db.create_event("sig1", "wallet123", 500, "gm", "low")
+    db.create_event("sig2", "wallet456", 500, "gn", "low")
+
+    assert db.approve_event("sig1")["status"] == "approved"
+    assert db.skip_event("sig2")["status"] == "skipped"
+    assert db.approve_event("missing") is None
+    assert db.get_pending_events() == []
+
+
+def test_clear_events(db):
+    db.create_event("sig1", "wallet123", 500, "gm", "low")
+    assert db.clear_events() == 1
+    assert db.get_pending_events() == []
+    assert db.get_leaderboard(by="total") == []
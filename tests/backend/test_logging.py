@@ -0,0 +1,82 @@
+"""
+Tests for the queue-backed JSON logging pipeline.
+Run with: pytest tests/backend/test_logging.py
+"""
+
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from logging_config import (
+    JsonFormatter, RateLimitFilter, SamplingFilter, _DeferredQueueHandler, parse_levels
+)
+
+
+def make_record(msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("listener", logging.INFO, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_includes_extras_and_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        import sys
+        record = make_record(clients=3, sample_every=5)
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "hello world"
+    assert entry["logger"] == "listener"
+    assert entry["clients"] == 3
+    assert "sample_every" not in entry
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_sampling_filter():
+    sampler = SamplingFilter()
+    passed = [sampler.filter(make_record(sample_every=10)) for _ in range(25)]
+    assert passed.count(True) == 3
+    assert sampler.filter(make_record())
+
+
+def test_rate_limit_filter_counts_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("logging_config.time.monotonic", lambda: now[0])
+    limiter = RateLimitFilter()
+
+    assert limiter.filter(make_record(rate_limit=60))
+    assert not limiter.filter(make_record(rate_limit=60))
+    assert not limiter.filter(make_record(rate_limit=60))
+    now[0] += 61
+    record = make_record(rate_limit=60)
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+
+
+def test_parse_levels():
+    assert parse_levels("listener=debug, main=WARNING,") == {
+        "listener": logging.DEBUG, "main": logging.WARNING
+    }
+
+
+def test_formatting_happens_on_listener_thread():
+    log_queue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    record = make_record()
+    handler.handle(record)
+    queued = log_queue.get_nowait()
+    assert queued.args == ("world",)  # not pre-formatted by the caller
+
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    handler.handle(make_record())
+    listener.stop()
+    assert json.loads(stream.getvalue())["msg"] == "hello world"
@@ -0,0 +1,98 @@
+"""
+Tests for the local media proxy cache.
+Run with: pytest tests/backend/test_media_cache.py
+"""
+
+import asyncio
+
+import pytest
+
+from media_cache import MediaCache
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, url):
+        self.calls.append(url)
+        await asyncio.sleep(0)
+        return f"body of {url}".encode() * 10, "image/png"
+
+
+def test_fetches_each_url_once(tmp_path):
+    fetch = FakeFetcher()
+    cache = MediaCache(str(tmp_path), max_bytes=10_000, fetch=fetch)
+    key = cache.register("https://arweave.net/logo").rsplit("/", 1)[-1]
+
+    async def fetch_concurrently():
+        return await asyncio.gather(cache.get(key), cache.get(key), cache.get(key))
+
+    entries = asyncio.run(fetch_concurrently())
+    assert asyncio.run(cache.get(key)) is entries[0]
+    assert fetch.calls == ["https://arweave.net/logo"]
+    assert asyncio.run(cache.get("unknown")) is None
+
+
+def test_lru_eviction_and_reload(tmp_path):
+    fetch = FakeFetcher()
+    cache = MediaCache(str(tmp_path), max_bytes=500, fetch=fetch)
+    urls = [f"https://example.com/{i}.png" for i in range(3)]
+    for url in urls:
+        asyncio.run(cache.prefetch(url))
+
+    assert cache.stats()["bytes"] <= 500
+    oldest = MediaCache.key_for(urls[0])
+    assert not (tmp_path / f"{oldest}.bin").exists()
+
+    reloaded = MediaCache(str(tmp_path), max_bytes=500, fetch=fetch)
+    assert reloaded.stats() == cache.stats()
+    asyncio.run(reloaded.get(MediaCache.key_for(urls[2])))
+    assert len(fetch.calls) == 3
+
+
+def test_downscale(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    import io
+
+    async def big_png(url):
+        out = io.BytesIO()
+        Image.new("RGB", (512, 256)).save(out, format="PNG")
+        return out.getvalue(), "image/png"
+
+    cache = MediaCache(str(tmp_path), max_bytes=10_000_000, max_size=128, fetch=big_png)
+    entry = asyncio.run(cache.prefetch("https://example.com/big.png"))
+    assert Image.open(entry["path"]).size == (128, 64)
+
+
+def test_endpoint_etag(app, client):
+    path = app.with_cached_logo({"logo": "https://arweave.net/logo"})["logo_cached"]
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["x-content-type-options"] == "nosniff"
+    etag = response.headers["etag"]
+
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    assert client.get("/media/cache/unknown").status_code == 404
+
+
+def test_rejects_non_media_content(app, client, tmp_path, monkeypatch):
+    from media_cache import UnsupportedMediaType
+
+    async def html_page(url):
+        return b"<script>alert(1)</script>", "text/html"
+
+    cache = MediaCache(str(tmp_path / "html"), max_bytes=10_000, fetch=html_page)
+    key = cache.register("https://evil.example/logo").rsplit("/", 1)[-1]
+    with pytest.raises(UnsupportedMediaType):
+        asyncio.run(cache.get(key))
+    assert cache.stats()["entries"] == 0
+    assert not (tmp_path / "html").exists()
+
+    monkeypatch.setattr(app, "media_cache", cache)
+    path = app.with_cached_logo({"logo": "https://evil.example/logo"})["logo_cached"]
+    assert client.get(path).status_code == 415
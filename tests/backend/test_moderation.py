@@ -0,0 +1,248 @@
+"""
+Tests for pluggable moderation scorers and the process-pool runner.
+Run with: pytest tests/backend/test_moderation.py
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from moderation import LinkScorer, ModerationRunner, Scorer, SpamScorer, parse_specs, score_batch
+
+
+class SlowScorer(Scorer):
+    name = "slow"
+
+    def score(self, memo):
+        time.sleep(0.5)
+        return 0.0
+
+
+class HangScorer(Scorer):
+    name = "hang"
+
+    def score(self, memo):
+        while memo == "hang":
+            time.sleep(1)
+        return 0.0
+
+
+class SlowLoadHangScorer(HangScorer):
+    name = "slow_load"
+
+    def __init__(self):
+        time.sleep(1)  # model load, longer than the scoring timeout
+
+
+class BrokenScorer(Scorer):
+    name = "broken"
+
+    def score(self, memo):
+        raise RuntimeError("model not loaded")
+
+
+def test_builtin_scorers():
+    links, spam = LinkScorer(), SpamScorer()
+    assert links.score("gm, great stream") == 0.0
+    assert links.score("free tokens at https://example.com") == 1.0
+    assert links.score("send to 7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU") == 0.9
+    assert spam.score("love the stream, keep going") == 0.0
+    assert spam.score("BUY BUY BUY BUY BUY BUY NOW") >= 0.8
+
+
+def test_parse_specs():
+    assert parse_specs(" links, spam ,,plugins.toxicity:ToxicityScorer") == (
+        "links", "spam", "plugins.toxicity:ToxicityScorer"
+    )
+
+
+def test_score_batch_skips_failing_scorer():
+    results, errors = score_batch(("links", f"{__name__}:BrokenScorer"), ["gm", "see example.com"])
+    assert results == [{"links": 0.0}, {"links": 1.0}]
+    assert errors == {"broken": "RuntimeError: model not loaded"}
+
+
+def test_worker_scorer_errors_are_logged_by_parent(caplog):
+    runner = ModerationRunner(["links", f"{__name__}:BrokenScorer"], batch_window=0)
+    try:
+        scores = asyncio.run(runner.score("gm"))
+    finally:
+        runner.shutdown()
+    assert scores == {"links": 0.0}
+    assert runner.flagged(scores)
+    assert "Scorer broken failed: RuntimeError: model not loaded" in caplog.text
+
+
+def test_unknown_scorer_fails_fast():
+    with pytest.raises(ValueError):
+        ModerationRunner(["nope"])
+    with pytest.raises(TypeError):
+        ModerationRunner([f"{__name__}:test_parse_specs"])
+
+
+def test_runner_batches_memos_in_process_pool():
+    runner = ModerationRunner(["links", "spam"], batch_window=0.05)
+
+    async def score_all():
+        return await asyncio.gather(*(runner.score(memo) for memo in ["gm", "visit scam.xyz", "hi"]))
+
+    try:
+        results = asyncio.run(score_all())
+    finally:
+        runner.shutdown()
+    assert results[1]["links"] == 1.0
+    assert runner.totals["batches"] == 1
+    assert runner.totals["scored"] == 3
+    assert [runner.flagged(scores) for scores in results] == [False, True, False]
+
+
+def test_runner_times_out_and_flags():
+    runner = ModerationRunner(
+        [f"{__name__}:SlowScorer"], timeout=0.1, batch_window=0,
+        executor_factory=lambda: ThreadPoolExecutor(max_workers=1)
+    )
+    try:
+        scores = asyncio.run(runner.score("gm"))
+    finally:
+        runner.shutdown()
+    assert scores is None
+    assert runner.flagged(scores)
+    assert runner.flagged({})  # missing scorer results count as flagged
+    assert runner.totals["timeouts"] == 1
+
+
+def test_hung_scorer_recycles_process_pool():
+    runner = ModerationRunner([f"{__name__}:HangScorer"], timeout=0.5, batch_window=0)
+
+    async def score_after_hang():
+        return await runner.score("hang"), await runner.score("gm"), await runner.score("gn")
+
+    try:
+        results = asyncio.run(score_after_hang())
+    finally:
+        runner.shutdown()
+    assert results == (None, {"hang": 0.0}, {"hang": 0.0})
+    assert runner.totals["timeouts"] == 1
+    # Once for the hung worker, once at shutdown
+    assert runner.totals["recycled"] == 2
+
+
+def test_pool_reloads_scorers_before_scoring_after_recycle():
+    runner = ModerationRunner([f"{__name__}:SlowLoadHangScorer"], timeout=0.8, batch_window=0)
+
+    async def score_after_hang():
+        first = await runner.score("hang")
+        rest = await asyncio.gather(*(runner.score(f"gm {i}") for i in range(4)))
+        return first, rest
+
+    try:
+        first, rest = asyncio.run(score_after_hang())
+    finally:
+        runner.shutdown()
+    # Loading the replacement pool does not count against the timeout
+    assert first is None
+    assert rest == [{"slow_load": 0.0}] * 4
+    assert runner.totals["timeouts"] == 1
+    assert runner.totals["scored"] == 4
+    # Once for the hung worker, once at shutdown
+    assert runner.totals["recycled"] == 2
+
+
+def test_backed_up_queue_does_not_time_out():
+    runner = ModerationRunner(
+        [f"{__name__}:SlowScorer"], timeout=0.8, batch_window=0, max_batch=1,
+        executor_factory=lambda: ThreadPoolExecutor(max_workers=1)
+    )
+
+    async def score_all():
+        return await asyncio.gather(*(runner.score(f"gm {i}") for i in range(3)))
+
+    try:
+        results = asyncio.run(score_all())
+    finally:
+        runner.shutdown()
+    # Each batch takes 0.5s; the last waits 1s for the worker but is not timed out
+    assert results == [{"slow": 0.0}] * 3
+    assert runner.totals["timeouts"] == 0
+    assert runner.totals["recycled"] == 1
+
+
+def test_auto_mode_respects_scores(client, app, monkeypatch):
+    runner = ModerationRunner(["links"], batch_window=0)
+    monkeypatch.setattr(app, "moderation", runner)
+    monkeypatch.setattr(app, "AUTO_MODE", True)
+
+    async def donate_and_score():
+        await app.handle_new_donation({"signature": "sig-clean", "amount": 5, "memo": "gm"})
+        await app.handle_new_donation({"signature": "sig-link", "amount": 5, "memo": "airdrop at https://example.com"})
+        await asyncio.sleep(0)
+        await asyncio.gather(*scoring_tasks())
+
+    try:
+        with client.websocket_connect("/ws/dashboard") as ws:
+            assert ws.receive_json()["type"] == "dashboard_init"
+            client.portal.call(donate_and_score)
+            messages = [ws.receive_json() for _ in range(5)]
+    finally:
+        runner.shutdown()
+
+    # Both events reach the dashboard before any scoring result
+    assert [m["type"] for m in messages[:2]] == ["new_event", "new_event"]
+    assert {(m["type"], m["event_id"]) for m in messages[2:]} == {
+        ("event_scored", "sig-clean"), ("event_scored", "sig-link"), ("event_approved", "sig-clean")
+    }
+
+    pending = client.get("/api/events/pending").json()
+    assert [event["id"] for event in pending] == ["sig-link"]
+    assert pending[0]["moderation_scores"] == {"links": 1.0}
+    assert client.get("/status").json()["moderation"]["scored"] == 2
+
+
+def test_slow_scoring_does_not_delay_new_events(client, app, monkeypatch):
+    runner = ModerationRunner(
+        [f"{__name__}:SlowScorer"], batch_window=0,
+        executor_factory=lambda: ThreadPoolExecutor(max_workers=1)
+    )
+    monkeypatch.setattr(app, "moderation", runner)
+    monkeypatch.setattr(app, "AUTO_MODE", True)
+
+    async def donate():
+        started = time.monotonic()
+        await app.handle_new_donation({"signature": "sig-1", "amount": 5, "memo": "gm"})
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*scoring_tasks())
+        return elapsed
+
+    try:
+        assert client.portal.call(donate) < 0.25
+    finally:
+        runner.shutdown()
+    assert client.get("/api/events/pending").json() == []
+
+
+def test_moderator_decision_wins_over_late_scores(client, app, monkeypatch):
+    runner = ModerationRunner(
+        [f"{__name__}:SlowScorer"], batch_window=0,
+        executor_factory=lambda: ThreadPoolExecutor(max_workers=1)
+    )
+    monkeypatch.setattr(app, "moderation", runner)
+    monkeypatch.setattr(app, "AUTO_MODE", True)
+
+    async def donate_then_skip():
+        await app.handle_new_donation({"signature": "sig-1", "amount": 5, "memo": "gm"})
+        app.skip_event("sig-1")
+        await asyncio.gather(*scoring_tasks())
+
+    try:
+        client.portal.call(donate_then_skip)
+    finally:
+        runner.shutdown()
+    assert client.get("/api/stats/leaderboard").json() == []
+
+
+def scoring_tasks():
+    import startup
+
+    return [task for task in startup._background_tasks if "score_new_event" in repr(task.get_coro())]
@@ -0,0 +1,73 @@
+"""
+Tests for staged startup, listener supervision and readiness reporting.
+Run with: pytest tests/backend/test_startup.py
+"""
+
+import asyncio
+
+import pytest
+
+import startup
+
+
+@pytest.fixture(autouse=True)
+def fresh_components():
+    startup.components.clear()
+    yield
+    startup.components.clear()
+
+
+def test_warm_up_records_timing_and_failure():
+    def broken():
+        raise RuntimeError("boom")
+
+    assert asyncio.run(startup.warm_up("ok", lambda: None))
+    assert not asyncio.run(startup.warm_up("broken", broken))
+
+    assert startup.components["ok"]["status"] == "ready"
+    assert startup.components["ok"]["duration_ms"] >= 0
+    assert startup.components["broken"]["status"] == "failed"
+    assert startup.components["broken"]["error"] == "boom"
+
+
+def test_supervise_restarts_crashed_task():
+    runs = []
+    crashes = []
+
+    async def flaky():
+        runs.append(1)
+        if len(runs) < 3:
+            raise ConnectionError("lost")
+
+    asyncio.run(startup.supervise(
+        "listener", flaky, initial_backoff=0.01,
+        on_error=lambda name, e: crashes.append(e)
+    ))
+
+    assert len(runs) == 3
+    assert len(crashes) == 2
+    assert startup.components["listener"]["status"] == "stopped"
+    assert startup.components["listener"]["restarts"] == 2
+
+
+def test_ready_requires_database():
+    startup.set_status("listener", "disabled")
+    assert not startup.is_ready()
+    startup.set_status("database", "ready")
+    startup.set_status("token_metadata", "starting")
+    assert not startup.is_ready()
+    startup.set_status("token_metadata", "failed", error="offline")
+    assert startup.is_ready()
+
+
+def test_ready_endpoint(client):
+    for _ in range(100):
+        response = client.get("/ready")
+        if response.status_code == 200:
+            break
+    report = response.json()
+
+    assert report["ready"]
+    assert set(report["components"]) == {"database", "moderation_filter", "token_metadata", "listener"}
+    assert report["components"]["listener"]["status"] == "disabled"
+    assert report["startup_seconds"] is not None
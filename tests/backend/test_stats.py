@@ -0,0 +1,109 @@
+"""
+Tests for incrementally maintained leaderboard and stream stats.
+Run with: pytest tests/backend/test_stats.py
+"""
+
+
+def test_aggregates_follow_create_and_approve(db):
+    db.create_event("sig1", "alice", 500, "hello", "low")
+    db.create_event("sig2", "bob", 5000, "gm", "mid")
+    db.create_event("sig3", "alice", 20000, "lfg", "high")
+
+    assert db.get_leaderboard(by="approved") == []
+    total = db.get_leaderboard(by="total")
+    assert [d["sender"] for d in total] == ["alice", "bob"]
+    assert total[0]["total_amount"] == 20500
+    assert total[0]["donation_count"] == 2
+
+    db.approve_event("sig2")
+    db.approve_event("sig2")  # approving twice must not double count
+    top = db.get_leaderboard(by="approved")
+    assert [(d["sender"], d["approved_amount"]) for d in top] == [("bob", 5000)]
+
+    stats = db.get_stats()
+    tiers = {t["tier"]: t for t in stats["tiers"]}
+    assert tiers["mid"]["approved_count"] == 1
+    assert stats["totals"]["donation_count"] == 3
+    assert stats["totals"]["total_amount"] == 25500
+    assert sum(m["donation_count"] for m in stats["per_minute"]) == 3
+
+
+def test_rebuild_matches_incremental(db):
+    db.create_event("sig1", "alice", 500, "hello", "low")
+    db.create_event("sig2", "bob", 5000, "gm", "mid")
+    db.create_event("sig3", "carol", 700, "gn", "low")
+    db.approve_event("sig1")
+    db.approve_event("sig3")
+    db.skip_event("sig3")  # approve then skip takes the approval back out
+    before = (db.get_leaderboard(by="total"), db.get_leaderboard(by="approved"), db.get_stats())
+    assert [d["sender"] for d in before[1]] == ["alice"]
+
+    db.rebuild_stats()
+    after = (db.get_leaderboard(by="total"), db.get_leaderboard(by="approved"), db.get_stats())
+    assert after == before
+
+
+def test_stats_endpoints(client, db):
+    db.create_event("sig1", "alice", 500, "hello", "low")
+    db.create_event("sig2", "bob", 5000, "gm", "mid")
+    db.approve_event("sig1")
+
+    assert [d["sender"] for d in client.get("/api/stats/leaderboard").json()] == ["alice"]
+    assert [d["sender"] for d in client.get("/api/stats/leaderboard?by=total").json()] == ["bob", "alice"]
+    assert len(client.get("/api/stats/leaderboard?by=total&limit=1").json()) == 1
+    assert client.get("/api/stats/leaderboard?by=nope").status_code == 400
+
+    stats = client.get("/api/stats?minutes=5").json()
+    assert stats["totals"]["donation_count"] == 2
+    assert stats["totals"]["approved_amount"] == 500
+
+    for url in ("/api/stats/leaderboard?limit=-1", "/api/stats/leaderboard?limit=0", "/api/stats?minutes=-5"):
+        assert client.get(url).status_code == 422
+
+
+def test_leaderboard_pushed_only_when_top_changes(client, app, db, monkeypatch):
+    monkeypatch.setattr(app, "LEADERBOARD_SIZE", 1)
+    db.create_event("sig1", "alice", 500, "hello", "low")
+    db.create_event("sig2", "bob", 100, "gm", "low")
+
+    with client.websocket_connect("/ws/overlay") as overlay:
+        assert overlay.receive_json()["type"] == "connected"
+        assert overlay.receive_json()["leaderboard"] == []
+
+        client.post("/api/events/action", json={"event_id": "sig1", "action": "approve"})
+        assert overlay.receive_json()["type"] == "show_donation"
+        update = overlay.receive_json()
+        assert update["type"] == "leaderboard_update"
+        assert [d["sender"] for d in update["leaderboard"]] == ["alice"]
+
+        # bob does not reach the top 1, so no update follows his alert
+        client.post("/api/events/action", json={"event_id": "sig2", "action": "approve"})
+        assert overlay.receive_json()["type"] == "show_donation"
+        overlay.send_json({"type": "ping"})
+        assert overlay.receive_json()["type"] == "pong"
+
+        # Taking alice's approval back changes the top 1
+        client.post("/api/events/action", json={"event_id": "sig1", "action": "skip"})
+        update = overlay.receive_json()
+        assert update["type"] == "leaderboard_update"
+        assert [d["sender"] for d in update["leaderboard"]] == ["bob"]
+
+
+def test_overlay_gets_leaderboard_on_connect(client, app, db):
+    db.create_event("sig1", "alice", 500, "hello", "low")
+    client.post("/api/events/action", json={"event_id": "sig1", "action": "approve"})
+    # As after a restart: nothing has been pushed yet
+    app.last_leaderboard = None
+
+    with client.websocket_connect("/ws/overlay") as overlay:
+        assert overlay.receive_json()["type"] == "connected"
+        update = overlay.receive_json()
+        assert update["type"] == "leaderboard_update"
+        assert [d["sender"] for d in update["leaderboard"]] == ["alice"]
+
+        # The first push after a restart is sent, later identical ones are not
+        client.portal.call(app.push_leaderboard_if_changed)
+        assert overlay.receive_json()["type"] == "leaderboard_update"
+        client.portal.call(app.push_leaderboard_if_changed)
+        overlay.send_json({"type": "ping"})
+        assert overlay.receive_json()["type"] == "pong"
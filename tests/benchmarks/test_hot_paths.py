@@ -0,0 +1,86 @@
+"""
+Microbenchmarks for backend hot paths.
+
+Compare against the stored baseline:
+    pytest tests/benchmarks --benchmark-only \
+        --benchmark-storage=tests/benchmarks/baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Refresh the baseline (commit the result):
+    pytest tests/benchmarks --benchmark-only \
+        --benchmark-storage=tests/benchmarks/baselines --benchmark-save=baseline
+"""
+
+import asyncio
+import itertools
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+MEMOS = [
+    "gm gm, loving the stream today!",
+    "this is definitely not a scam lol",
+    "LFG ai16z to the moon 🚀🚀🚀",
+    "first time donating, keep it up",
+]
+
+
+class NullSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_is_memo_banned(benchmark, db):
+    db.load_banned_words()
+    memos = itertools.cycle(MEMOS)
+    benchmark(lambda: db.is_memo_banned(next(memos)))
+
+
+def test_create_event(benchmark, db):
+    counter = itertools.count()
+
+    def create():
+        i = next(counter)
+        db.create_event(f"bench-{i}", f"wallet{i % 50}", 1500.0, MEMOS[i % len(MEMOS)], "mid")
+
+    benchmark(create)
+
+
+def test_get_pending_events(benchmark, db):
+    for i in range(200):
+        db.create_event(f"pending-{i}", f"wallet{i % 50}", 500.0, MEMOS[i % len(MEMOS)], "low")
+    events = benchmark(db.get_pending_events)
+    assert len(events) == 200
+
+
+def test_classify_tier(benchmark, app):
+    amounts = itertools.cycle([5, 1500, 25000, 250000])
+    benchmark(lambda: app.classify_tier(next(amounts)))
+
+
+def test_event_to_dict(benchmark, db):
+    event = db.create_event("to-dict", "wallet1", 1500.0, MEMOS[0], "mid")
+    benchmark(event.to_dict)
+
+
+def test_broadcast_fan_out(benchmark, app):
+    from connections import ConnectionManager
+
+    manager = ConnectionManager("bench", max_connections=100)
+    loop = asyncio.new_event_loop()
+    for _ in range(100):
+        loop.run_until_complete(manager.connect(NullSocket()))
+    message = {"type": "show_donation", "event": {"id": "sig", "memo": MEMOS[0], "amount": 1500.0}}
+
+    try:
+        benchmark(lambda: loop.run_until_complete(manager.broadcast(message)))
+    finally:
+        loop.close()
+    assert len(manager) == 100
@@ -0,0 +1,149 @@
+"""
+Shared pytest setup.
+
+Makes the backend modules importable the same way `uvicorn main:app` does
+from inside backend/, keeps tests away from the real overlay.db, and
+provides fixtures for an isolated database, an in-process app client and
+a mock Helius server.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='overlay-tests-'), 'overlay.db')}"
+)
+for name in ("HELIUS_API_KEY", "PRIZE_WALLET_ADDRESS", "AUTO_MODE", "MODERATION_SCORERS"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The database module bound to a fresh temporary SQLite file."""
+    from sqlalchemy.orm import sessionmaker
+    import database
+
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'overlay.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(database, "_banned_words", None)
+    database.memo_clusters.clear()
+    database.init_db()
+    yield database
+    database.memo_clusters.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def app(db, tmp_path, monkeypatch):
+    """The FastAPI module with fresh connection, media and startup state."""
+    import main
+    import startup
+    from media_cache import MediaCache
+
+    startup.components.clear()
+    monkeypatch.setattr(main, "AUTO_MODE", False)
+    monkeypatch.setattr(main, "last_leaderboard", None)
+    monkeypatch.setattr(main, "overlay_clients", main.connection_manager("overlay"))
+    monkeypatch.setattr(main, "dashboard_clients", main.connection_manager("dashboard"))
+    monkeypatch.setattr(main, "media_cache", MediaCache(
+        str(tmp_path / "media"), max_bytes=1024 * 1024, fetch=_offline_fetch
+    ))
+    monkeypatch.setattr(main, "token_metadata_cache", {})
+    monkeypatch.setattr(main, "moderation", None)
+    yield main
+    startup.components.clear()
+
+
+@pytest.fixture
+def client(app):
+    """In-process client with startup and shutdown events run."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app.app) as test_client:
+        yield test_client
+
+
+async def _offline_fetch(url):
+    """Media fetcher for tests: never touches the network."""
+    return b"test media", "image/png"
+
+
+class MockHelius:
+    """Canned Helius RPC and REST responses served from a local thread."""
+
+    def __init__(self):
+        self.assets = {}
+        self.transactions = []
+        self.token_accounts = []
+        self.requests = []
+
+    def rpc(self, payload):
+        method, params = payload.get("method"), payload.get("params")
+        if method == "getAsset":
+            asset = self.assets.get(params["id"])
+            return {"result": asset} if asset else {"error": {"code": -32000, "message": "not found"}}
+        if method == "getTokenAccountsByOwner":
+            return {"result": {"value": [{"pubkey": pubkey} for pubkey in self.token_accounts]}}
+        return {"error": {"code": -32601, "message": f"unknown method {method}"}}
+
+
+@pytest.fixture
+def helius(monkeypatch):
+    """A mock Helius server; main and listener are pointed at it."""
+    mock = MockHelius()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, body):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            mock.requests.append(("POST", self.path, payload))
+            self._reply({"jsonrpc": "2.0", "id": payload.get("id"), **mock.rpc(payload)})
+
+        def do_GET(self):
+            mock.requests.append(("GET", self.path, None))
+            if re.match(r"^/v0/addresses/[^/]+/transactions", self.path):
+                # Serve the first page, then nothing older
+                self._reply([] if "before=" in self.path else mock.transactions)
+            else:
+                self.send_error(404)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    import main
+    import listener
+    monkeypatch.setenv("HELIUS_API_KEY", "test-key")
+    monkeypatch.setattr(main, "HELIUS_RPC_BASE", base)
+    monkeypatch.setattr(listener, "RPC_BASE", base)
+    monkeypatch.setattr(listener, "HELIUS_BASE", f"{base}/v0")
+    monkeypatch.setattr(listener, "API_KEY", "test-key")
+    monkeypatch.setattr(listener, "PRIZE_WALLET", "PrizeWallet111")
+
+    yield mock
+    server.shutdown()
+    server.server_close()